@@ -0,0 +1,258 @@
+"""Benchmarks of engine subsystems on generated scenes.
+
+Every scene is built with a fixed seed in a headless Game and simulated for a
+number of ticks. Calls of PhysicsSystem.update, CollisionSystem.process_collision,
+the collision system's Broadphase.find_pairs (part of collision, including
+incremental grid maintenance) and SceneRenderSystem.render (once per frame)
+are timed separately.
+With --workers, scenes are also run with RegionPhysics in that many worker
+processes, timed as 'regions' (integration and collision together).
+
+Usage:
+    python benchmark.py --counts 100 1000 5000 --ticks 120 --output bench.json
+    python benchmark.py --scenes clusters --counts 20000 --workers 0 2 4
+"""
+from game import Game
+from entity import Entity
+from components import *
+from physic_system import GridBroadphase, ParallelSweepBroadphase, SortAndSweepBroadphase
+from render_systems import SceneRenderSystem
+from typing import Callable
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+
+RESOLUTION = (80, 40)
+FPS = 30
+TICKSPEED = 60
+
+
+def _static(id: int, pos, size, texture_id=None) -> Entity:
+    entity = Entity(id)
+    entity.add_component(Transform(pos=np.array(pos, dtype=np.float32)))
+    entity.add_component(Collider(hitbox_x=int(size[0]), hitbox_y=int(size[1])))
+    entity.add_component(Render(draw_priority=0, texture_id=texture_id))
+    return entity
+
+
+def _body(id: int, pos, velocity, size=(1, 1), mass=1.0, texture_id=None) -> Entity:
+    entity = _static(id, pos, size, texture_id)
+    entity.add_component(Physics(
+        mass=mass,
+        velocity=np.array(velocity, dtype=np.float32),
+        acceleration=np.zeros(2, dtype=np.float32),
+        velocity_limit=50.0
+    ))
+    entity.get_component(Render).draw_priority = 1
+    return entity
+
+
+def _camera(game: Game, ids, pos):
+    """Adds an invisible entity the camera follows"""
+    camera = Entity(next(ids)).add_component(Transform(pos=np.array(pos, dtype=np.float32)))
+    game.add_entity(camera)
+    return camera
+
+
+def box_scene(game: Game, n: int, rng: np.random.Generator):
+    """Bodies moving in a closed box at constant density"""
+    ids = itertools.count()
+    side = max(10, int(np.sqrt(n) * 4))
+    for pos, size in (((-1, -1), (side + 2, 1)), ((-1, side), (side + 2, 1)),
+                      ((-1, 0), (1, side)), ((side, 0), (1, side))):
+        game.add_entity(_static(next(ids), pos, size))
+    positions = rng.uniform(0, side - 1, (n, 2))
+    velocities = rng.uniform(-10, 10, (n, 2))
+    for pos, velocity in zip(positions, velocities):
+        game.add_entity(_body(next(ids), pos, velocity, texture_id='star'))
+    return _camera(game, ids, (side / 2, side / 2))
+
+
+def bullet_scene(game: Game, n: int, rng: np.random.Generator):
+    """About n bullets crossing the field at any time, spawned and removed every tick"""
+    ids = itertools.count()
+    width, height, speed = 100, 60, 50.0
+    lifetime = width / speed * TICKSPEED
+    for pos in rng.uniform((width / 2, 0), (width, height), (max(1, n // 50), 2)):
+        game.add_entity(_static(next(ids), pos, (4, 3), 'enemy'))
+
+    def spawn(x):
+        bullet = _body(next(ids), (x, rng.uniform(0, height)), (speed, rng.uniform(-2, 2)),
+                       mass=0.1, texture_id='bullet')
+        def update(game):
+            if bullet.transform.pos[0] > width: game.remove_entity(bullet.id)
+        def hit(entity, other):
+            if other.physics is None: game.remove_entity(entity.id)
+        bullet.add_component(Script(on_tick=update, on_collision=hit))
+        game.add_entity(bullet)
+
+    for x in rng.uniform(0, width, n):
+        spawn(x)
+
+    rate = n / lifetime
+    budget = [0.0]
+    def fire(game):
+        budget[0] += rate
+        while budget[0] >= 1:
+            budget[0] -= 1
+            spawn(0.0)
+
+    gun = Entity(next(ids)).add_component(Script(on_tick=fire))
+    game.add_entity(gun)
+    return _camera(game, ids, (width / 2, height / 2))
+
+
+def static_scene(game: Game, n: int, rng: np.random.Generator):
+    """Mostly static level geometry with a few movers"""
+    ids = itertools.count()
+    movers = max(1, n // 10)
+    side = max(10, int(np.sqrt(n) * 4))
+    cells = rng.choice(side // 2 * (side // 2), n - movers, replace=False)
+    for cell in cells:
+        game.add_entity(_static(next(ids), (cell % (side // 2) * 2, cell // (side // 2) * 2), (1, 1)))
+    for pos, velocity in zip(rng.uniform(0, side, (movers, 2)), rng.uniform(-10, 10, (movers, 2))):
+        game.add_entity(_body(next(ids), pos, velocity, texture_id='star'))
+    return _camera(game, ids, (side / 2, side / 2))
+
+
+def cluster_scene(game: Game, n: int, rng: np.random.Generator):
+    """Bodies packed into a few dense overlapping clusters"""
+    ids = itertools.count()
+    centers = rng.uniform(0, 200, (8, 2))
+    positions = centers[rng.integers(0, len(centers), n)] + rng.normal(0, np.sqrt(n) / 8 + 1, (n, 2))
+    for pos, velocity in zip(positions, rng.uniform(-1, 1, (n, 2))):
+        game.add_entity(_body(next(ids), pos, velocity, size=(2, 2)))
+    return _camera(game, ids, centers[0])
+
+
+BROADPHASES: dict[str, Callable] = {
+    'grid': lambda: GridBroadphase((3, 3)),
+    'sweep': SortAndSweepBroadphase,
+    'parallel': ParallelSweepBroadphase,
+}
+
+
+SCENES: dict[str, Callable] = {
+    'box': box_scene,
+    'bullets': bullet_scene,
+    'static': static_scene,
+    'clusters': cluster_scene,
+}
+
+
+def _timed(durations: list, function: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+
+def _stats(durations: list) -> dict:
+    if not durations:
+        return {'calls': 0}
+    ms = np.array(durations) * 1000
+    return {
+        'calls': len(ms),
+        'total_ms': round(float(ms.sum()), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+        'p95_ms': round(float(np.percentile(ms, 95)), 4),
+        'max_ms': round(float(ms.max()), 4),
+    }
+
+
+def run_scene(name: str, n: int, ticks: int, seed: int, workers: int = 0, broadphase: str = 'grid') -> dict:
+    """Builds a scene of about n entities and simulates it for the given ticks"""
+    rng = np.random.default_rng(seed)
+    game = Game(RESOLUTION, FPS, TICKSPEED, headless=True, physics_workers=workers,
+                broadphase=BROADPHASES[broadphase]())
+    camera = SCENES[name](game, n, rng)
+    render_system = SceneRenderSystem(RESOLUTION)
+    render_system.set_target(camera)
+    renderables = game.query(Transform, Render)
+
+    durations = {'physics': [], 'collision': [], 'broadphase': [], 'render': []}
+    pair_finder = game.collision_system.broadphase
+    game.physics_system.update = _timed(durations['physics'], game.physics_system.update)
+    game.collision_system.process_collision = _timed(durations['collision'], game.collision_system.process_collision)
+    pair_finder.find_pairs = _timed(durations['broadphase'], pair_finder.find_pairs)
+    if workers:
+        # Workers start outside the measurement
+        game.region_physics.start(game.world)
+        durations['regions'] = []
+        game.region_physics.update = _timed(durations['regions'], game.region_physics.update)
+    render = _timed(durations['render'], render_system.render)
+    frame_time = []
+
+    def on_frame(game):
+        # Frame work is kept out of ticks/sec
+        start = time.perf_counter()
+        render(renderables)
+        frame_time.append(time.perf_counter() - start)
+
+    game.on_frame = on_frame
+    try:
+        start = time.perf_counter()
+        game.step(ticks)
+        elapsed = time.perf_counter() - start - sum(frame_time)
+    finally:
+        game.close()
+    return {
+        'scene': name,
+        'entities': n,
+        'workers': workers,
+        'broadphase': broadphase,
+        'entities_end': len(game.entities),
+        'ticks': ticks,
+        'ticks_per_sec': round(ticks / elapsed, 2),
+        'systems': {system: _stats(d) for system, d in durations.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenes', nargs='+', choices=list(SCENES), default=list(SCENES))
+    parser.add_argument('--counts', nargs='+', type=int, default=[100, 1000, 5000])
+    parser.add_argument('--ticks', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--broadphase', nargs='+', choices=list(BROADPHASES), default=['grid'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[0],
+                        help='physics worker processes, 0 runs physics in the main process')
+    parser.add_argument('--output', help='JSON file to write, printed to stdout if omitted')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.scenes:
+        for n in args.counts:
+            for broadphase in args.broadphase:
+                for workers in args.workers:
+                    result = run_scene(name, n, args.ticks, args.seed, workers, broadphase)
+                    results.append(result)
+                    print(f"{name:>9} {n:>7} entities, {broadphase:>8}, {workers} workers: "
+                          f"{result['ticks_per_sec']:>9} ticks/s", file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -66,6 +66,8 @@ class Script:
         on_frame: Callback executed each game frame.
         on_remove: Callback executed when the entity is removed.
         on_collision: Callback executed when the entity collides with another.
+        name: Name the script factory is registered under in the Game, lets
+              snapshots re-attach the script. Defaults to None.
     
     Note:
         All callbacks should be callable objects (functions, lambdas, etc.)
@@ -75,4 +77,5 @@ class Script:
     on_frame: Optional[Callable] = lambda game: None
     on_remove: Optional[Callable] = lambda game: None
     on_collision: Optional[Callable] = lambda entity, other: None
+    name: Optional[str] = None
     
\ No newline at end of file
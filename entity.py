@@ -1,12 +1,107 @@
 from typing import Dict, Any, Optional
+from collections import deque
+import numpy as np
 from components import *
 
+
+class EntityIds:
+    """Allocator of entity ids with generation counters.
+
+    An id packs an index (low INDEX_BITS bits) and the generation of that
+    index. Releasing an id bumps the generation, so once its index is handed
+    out again the old id stays stale: lookups by it fail instead of finding
+    the new entity. Freed indices are reused oldest first.
+    """
+    INDEX_BITS = 32
+    INDEX_MASK = (1 << INDEX_BITS) - 1
+
+    def __init__(self):
+        self.generations: list[int] = []
+        self.alive: list[bool] = []
+        self.free = deque()
+
+    def allocate(self) -> int:
+        """Returns a new id"""
+        if self.free:
+            index = self.free.popleft()
+        else:
+            index = len(self.generations)
+            self.generations.append(0)
+            self.alive.append(False)
+        self.alive[index] = True
+        return self.generations[index] << self.INDEX_BITS | index
+
+    def allocate_many(self, n: int) -> list[int]:
+        """Returns n new ids"""
+        free, alive, generations = self.free, self.alive, self.generations
+        reused = [free.popleft() for _ in range(min(n, len(free)))]
+        for index in reused:
+            alive[index] = True
+        start = len(generations)
+        fresh = n - len(reused)
+        generations.extend([0] * fresh)
+        alive.extend([True] * fresh)
+        return [generations[index] << self.INDEX_BITS | index for index in reused] + list(range(start, start + fresh))
+
+    def claim(self, ids: np.ndarray):
+        """Marks existing ids, e.g. restored ones, as allocated.
+
+        Ids far beyond the allocated range (explicit ids such as random
+        numbers) are skipped to keep the tables dense; the game still
+        checks new ids against existing entities.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        indices = ids & self.INDEX_MASK
+        keep = (ids >= 0) & (indices < len(self.generations) + 2 * len(ids))
+        ids, indices = ids[keep], indices[keep]
+        if not len(ids): return
+        size = max(len(self.generations), int(indices.max()) + 1)
+        generations = np.zeros(size, dtype=np.int64)
+        generations[:len(self.generations)] = self.generations
+        alive = np.zeros(size, dtype=np.bool_)
+        alive[:len(self.alive)] = self.alive
+        if alive[indices].any():
+            raise ValueError('Claimed ids overlap allocated ones')
+        generations[indices] = ids >> self.INDEX_BITS
+        alive[indices] = True
+        fresh = np.arange(len(self.generations), size)
+        self.free = deque([index for index in self.free if not alive[index]] + fresh[~alive[fresh]].tolist())
+        self.generations = generations.tolist()
+        self.alive = alive.tolist()
+
+    def is_alive(self, id: int) -> bool:
+        """Whether id was allocated and not released since"""
+        index = id & self.INDEX_MASK
+        return (0 <= id and index < len(self.generations) and self.alive[index]
+                and self.generations[index] == id >> self.INDEX_BITS)
+
+    def release(self, id: int):
+        """Frees an allocated id, ids not allocated here are ignored"""
+        if not self.is_alive(id): return
+        index = id & self.INDEX_MASK
+        self.alive[index] = False
+        self.generations[index] += 1
+        self.free.append(index)
+
 class Entity:
+    """Handle to a game object.
+
+    Until the entity is added to a World its components are kept in
+    `components_dict`. Afterwards they live in the world's archetype columns
+    and component properties return live views into that storage.
+    Tags are plain strings used to group entities in queries.
+    """
+    components = [Transform, Render, Physics, Script, Collider]
+
     def __init__(self, id: int):
         self.id = id
-        self.components = [Transform, Render, Physics, Script, Collider]
         self.components_dict: Dict[type, Any] = {}
-    
+        self._tags = set()
+        self.world = None
+        self._archetype = None
+        self._row = -1
+        self._slot = -1
+
     def get_type(self, component):
         for c in self.components:
             if isinstance(component, c): return c
@@ -14,31 +109,73 @@ class Entity:
 
     def add_component(self, component):
         """Add an object of component to entity"""
-        self.components_dict[self.get_type(component)] = component
+        if self.world is not None:
+            self.world.set_component(self, component)
+        else:
+            self.components_dict[self.get_type(component)] = component
+        return self
+
+    def remove_component(self, component_type):
+        """Remove a component type from entity"""
+        if self.world is not None:
+            self.world.remove_component(self, component_type)
+        else:
+            self.components_dict.pop(component_type, None)
         return self
-    
+
     def get_component(self, component_type):
+        if self.world is not None:
+            return self.world.get_component(self, component_type)
         return self.components_dict.get(component_type)
-    
+
     def has_component(self, component_type):
-        return component_type in self.components
-    
+        if self.world is not None:
+            return component_type in self._archetype.signature
+        return component_type in self.components_dict
+
+    @property
+    def tags(self) -> frozenset:
+        if self.world is not None:
+            return frozenset(t for t in self._archetype.signature if isinstance(t, str))
+        return frozenset(self._tags)
+
+    def add_tag(self, tag: str):
+        """Add a tag to entity"""
+        if self.world is not None:
+            self.world.add_tag(self, tag)
+        else:
+            self._tags.add(tag)
+        return self
+
+    def remove_tag(self, tag: str):
+        """Remove a tag from entity"""
+        if self.world is not None:
+            self.world.remove_tag(self, tag)
+        else:
+            self._tags.discard(tag)
+        return self
+
+    def has_tag(self, tag: str) -> bool:
+        if self.world is not None:
+            return tag in self._archetype.signature
+        return tag in self._tags
+
     @property
     def transform(self) -> Optional[Transform]:
         return self.get_component(Transform)
-    
+
     @property
     def physics(self) -> Optional[Physics]:
         return self.get_component(Physics)
-    
+
     @property
     def collider(self) -> Optional[Collider]:
         return self.get_component(Collider)
-    
+
     @property
     def render(self) -> Optional[Render]:
         return self.get_component(Render)
-    
+
     @property
     def script(self) -> Optional[Script]:
         return self.get_component(Script)
\ No newline at end of file
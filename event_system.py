@@ -1,8 +1,9 @@
 from typing import Any, Callable, Optional
 from abc import ABC
 from time import time
-from copy import copy
+from bisect import insort
 from enum import IntEnum
+import numpy as np
 
 
 class Phase(IntEnum):
@@ -27,12 +28,106 @@ class Event(ABC):
         self.source = source
 
 
+class CollisionEvent(Event):
+    """All collisions resolved in one tick.
+
+    Attributes:
+        entities: Entity handles referenced by pairs.
+        pairs: (k, 2) indices into entities of colliding pairs.
+        normals: (k, 2) collision normals pointing from first to second entity.
+        penetrations: (k,) penetration depths along the normals.
+        tick: Tick the collisions were resolved at.
+    """
+
+    def __init__(
+        self,
+        entities: list,
+        pairs: np.ndarray,
+        normals: np.ndarray,
+        penetrations: np.ndarray,
+        tick: int = 0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.entities = entities
+        self.pairs = pairs
+        self.normals = normals
+        self.penetrations = penetrations
+        self.tick = tick
+
+    def __len__(self):
+        return len(self.pairs)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """(k, 2) ids of colliding entities"""
+        entities = self.entities
+        return np.array([(entities[i].id, entities[j].id) for i, j in self.pairs.tolist()],
+                        dtype=np.int64).reshape(-1, 2)
+
+    def entity_pairs(self):
+        """Yields (entity, other) handles of every collision"""
+        entities = self.entities
+        for i, j in self.pairs.tolist():
+            yield entities[i], entities[j]
+
+
+class Subscription:
+    """Handler subscribed to an event type."""
+    __slots__ = ('id', 'event_type', 'handler', 'priority', 'seq', 'active')
+
+    def __init__(self, id: int, event_type: type[Event], handler: Callable[[Event], None],
+                 priority: int, seq: int):
+        self.id = id
+        self.event_type = event_type
+        self.handler = handler
+        self.priority = priority
+        self.seq = seq
+        self.active = True
+
+
+class _PhaseTable:
+    """Subscriptions and queued events of one phase."""
+    __slots__ = ('by_type', 'by_id', 'resolved', 'queue', 'ordered', 'dead', 'live')
+
+    def __init__(self):
+        # Per subscribed type: (-priority, seq, subscription), kept sorted
+        self.by_type: dict[type, list] = {}
+        self.by_id: dict[int, list[Subscription]] = {}
+        # Per concrete event class: handlers of all matching types in call order
+        self.resolved: dict[type, tuple[Subscription, ...]] = {}
+        self.queue: list[Event] = []
+        # Whether queue is already in dispatch order
+        self.ordered = True
+        self.dead = 0
+        self.live = 0
+
+
+def _event_order(event: Event):
+    return -event.priority, event.timestamp
+
+
 class EventBus:
-    """Central event routing system."""
+    """Central event routing system.
+
+    Subscriptions are kept sorted by priority per event type, and the
+    handler list for a concrete event class (all subscriptions to the class
+    and its bases) is resolved once and cached until the phase's
+    subscriptions change. Dispatch cost is proportional to the handlers
+    actually called.
+
+    Events are handled in order of priority, then timestamp; queues are only
+    sorted when events arrive out of order. Events emitted while a phase is
+    dispatched are handled by its next dispatch, and so are subscriptions
+    made meanwhile. Unsubscribing is O(1) per subscription: the entries are
+    deactivated immediately and removed from the tables in batches.
+    """
+    # Dead subscriptions of a phase tolerated before its tables are compacted
+    COMPACT_THRESHOLD = 64
 
     def __init__(self):
-        self.subscribers = {phase: [] for phase in Phase}
-        self.event_queue = {phase: [] for phase in Phase}
+        self.phases = {phase: _PhaseTable() for phase in Phase}
+        self._seq = 0
 
     def subscribe(
         self,
@@ -41,37 +136,74 @@ class EventBus:
         event_type: type[Event],
         handler: Callable[[Event], None],
         priority: int = 0
-    ):
+    ) -> Subscription:
         """Subscribe handler to event type in a phase."""
-        self.subscribers[phase].append({
-            'event_type': event_type,
-            'id': id,
-            'priority': priority,
-            'handler': handler
-        })
+        table = self.phases[phase]
+        subscription = Subscription(id, event_type, handler, priority, self._seq)
+        self._seq += 1
+        insort(table.by_type.setdefault(event_type, []), (-priority, subscription.seq, subscription))
+        table.by_id.setdefault(id, []).append(subscription)
+        table.live += 1
+        table.resolved.clear()
+        return subscription
 
     def unsubscribe(self, phase: Phase, id: int):
         """Remove all subscriptions for given id in phase."""
-        self.subscribers[phase] = [
-            sub for sub in self.subscribers[phase]
-            if sub['id'] != id
-        ]
+        table = self.phases[phase]
+        subscriptions = table.by_id.pop(id, ())
+        for subscription in subscriptions:
+            subscription.active = False
+        table.live -= len(subscriptions)
+        table.dead += len(subscriptions)
+        if table.dead > self.COMPACT_THRESHOLD and table.dead > table.live:
+            self._compact(table)
+
+    def _compact(self, table: _PhaseTable):
+        """Drops inactive subscriptions from a phase's tables"""
+        for event_type, entries in list(table.by_type.items()):
+            entries[:] = [entry for entry in entries if entry[2].active]
+            if not entries: del table.by_type[event_type]
+        table.resolved.clear()
+        table.dead = 0
+
+    def handlers(self, phase: Phase, event_class: type) -> tuple[Subscription, ...]:
+        """Returns subscriptions receiving events of a class, in call order."""
+        table = self.phases[phase]
+        handlers = table.resolved.get(event_class)
+        if handlers is None:
+            entries = []
+            for event_type, typed in table.by_type.items():
+                if issubclass(event_class, event_type):
+                    entries.extend(typed)
+            entries.sort()
+            handlers = table.resolved[event_class] = tuple(entry[2] for entry in entries if entry[2].active)
+        return handlers
 
     def emit(self, phase: Phase, event: Event):
         """Queue event for processing in phase."""
-        self.event_queue[phase].append(event)
+        table = self.phases[phase]
+        queue = table.queue
+        if table.ordered and queue and _event_order(event) < _event_order(queue[-1]):
+            table.ordered = False
+        queue.append(event)
 
     def dispatch(self, phase: Phase):
         """Dispatch all queued events for phase."""
-        events = copy(self.event_queue[phase])
-        self.event_queue[phase] = []
-
-        subs = copy(self.subscribers[phase])
-
-        events.sort(key=lambda e: (-e.priority, e.timestamp))
-        subs.sort(key=lambda s: -s['priority'])
+        table = self.phases[phase]
+        events = table.queue
+        if not events: return
+        table.queue = []
+        if not table.ordered:
+            events.sort(key=_event_order)
+            table.ordered = True
 
+        # Subscriptions made by handlers wait for the next dispatch
+        seq = self._seq
+        resolved = table.resolved
         for e in events:
-            for sub in subs:
-                if isinstance(e, sub['event_type']):
-                    sub['handler'](e)
+            handlers = resolved.get(type(e))
+            if handlers is None:
+                handlers = self.handlers(phase, type(e))
+            for sub in handlers:
+                if sub.active and sub.seq < seq:
+                    sub.handler(e)
@@ -6,31 +6,77 @@ import random
 
 
 class SpaceShooter:
-    def __init__(self):
+    def __init__(self, headless=False):
         # Создаем игру с разрешением 80x40, 30 FPS, 60 тиков в секунду
+        # (headless - без клавиатуры и отрисовки, для прогонов через step)
         self.game = Game(
             resolution=(80, 40),
             fps=30,
             tickspeed=60,
-            elasticity=0.5
+            elasticity=0.5,
+            headless=headless
         )
         
         # Настраиваем колбэки
         self.game.on_tick = self.on_tick
         self.game.on_frame = self.on_frame
         
-        # Счетчики
+        # Счетчики (число врагов считается по тегу "enemy" в самой игре)
         self.score = 0
-        self.enemies_count = 0
         self.max_enemies = 15
         self.game_time = 0
         
+        # Регистрируем скрипты для снимков состояния
+        self.game.register_script("player", self.player_script)
+        self.game.register_script("bullet", self.bullet_script)
+        self.game.register_script("enemy", self.enemy_script)
+        self.game.register_script("star", self.star_script)
+        
+        # Шаблоны пуль, врагов и звезд из prefabs.json. Пули и враги
+        # создаются и удаляются постоянно, поэтому берутся из пула
+        # через spawn/despawn
+        self.game.load_prefabs()
+        
         # Инициализируем игру
         self.init_game()
     
+    @property
+    def enemies_count(self):
+        return len(self.game.query("enemy"))
+    
+    # Скрипты создаются по имени, чтобы их можно было восстановить из снимка.
+    # Фабрика получает игру, в которой создается сущность, и скрипты работают
+    # только с ней: у копии игры (fork) свои сущности
+    def player_script(self, game, player):
+        return Script(
+            name="player",
+            on_tick=lambda game: self.update_player(game, player),
+            on_collision=lambda entity, other: self.on_player_collision(game, entity, other)
+        )
+    
+    def bullet_script(self, game, bullet):
+        return Script(
+            name="bullet",
+            on_tick=lambda game: self.update_bullet(game, bullet),
+            on_collision=lambda entity, other: self.on_bullet_collision(game, entity, other)
+        )
+    
+    def enemy_script(self, game, enemy):
+        return Script(
+            name="enemy",
+            on_tick=lambda game: self.update_enemy(game, enemy),
+            on_collision=lambda entity, other: self.on_enemy_collision(game, entity, other)
+        )
+    
+    def star_script(self, game, star):
+        return Script(
+            name="star",
+            on_tick=lambda game: self.update_star(game, star)
+        )
+    
     def create_player(self):
         """Создает игрока (космический корабль)"""
-        player = Entity(id=0)
+        player = Entity(id=self.game.new_id())
         player.add_component(Transform(pos=np.array([10.0, 20.0], dtype=np.float32)))
         player.add_component(Physics(
             mass=1.0,
@@ -44,86 +90,28 @@ class SpaceShooter:
             draw_priority=2,
             texture_id="player"
         ))
-        player.add_component(Script(
-            on_tick=lambda game: self.update_player(player),
-            on_collision=lambda entity, other: self.on_player_collision(entity, other)
-        ))
+        player.add_component(self.player_script(self.game, player))
         
         return player
     
-    def create_bullet(self, pos, velocity):
+    def create_bullet(self, game, pos, velocity):
         """Создает пулю"""
-        bullet_id = random.randint(1000, 9999)
-        bullet = Entity(id=bullet_id)
-        bullet.add_component(Transform(pos=pos.copy()))
-        bullet.add_component(Physics(
-            mass=0.1,
-            velocity=velocity,
-            acceleration=np.array([0.0, 0.0], dtype=np.float32),
-            velocity_limit=20.0
-        ))
-        bullet.add_component(Collider(hitbox_x=1, hitbox_y=1, has_collision=True))
-        bullet.add_component(Render(
-            is_visible=True,
-            draw_priority=1,
-            texture_id="bullet"
-        ))
-        bullet.add_component(Script(
-            on_tick=lambda game: self.update_bullet(bullet),
-            on_collision=lambda entity, other: self.on_bullet_collision(entity, other)
-        ))
-        
-        self.game.add_entity(bullet)
-        return bullet
+        return game.spawn("bullet", pos=pos, velocity=velocity)
     
-    def create_enemy(self, pos):
+    def create_enemy(self, game, pos):
         """Создает вражеский корабль"""
-        enemy_id = random.randint(100, 999)
-        enemy = Entity(id=enemy_id)
-        enemy.add_component(Transform(pos=pos.copy()))
-        enemy.add_component(Physics(
-            mass=1.5,
-            velocity=np.array([-1.0, random.uniform(-0.5, 0.5)], dtype=np.float32),
-            acceleration=np.array([0.0, 0.0], dtype=np.float32),
-            velocity_limit=3.0
-        ))
-        enemy.add_component(Collider(hitbox_x=4, hitbox_y=2, has_collision=True))
-        enemy.add_component(Render(
-            is_visible=True,
-            draw_priority=1,
-            texture_id="enemy"
-        ))
-        enemy.add_component(Script(
-            on_tick=lambda game: self.update_enemy(enemy),
-            on_collision=lambda entity, other: self.on_enemy_collision(entity, other)
-        ))
-        
-        self.game.add_entity(enemy)
-        self.enemies_count += 1
-        return enemy
+        velocity = np.array([-1.0, random.uniform(-0.5, 0.5)], dtype=np.float32)
+        return game.spawn("enemy", pos=pos, velocity=velocity)
     
-    def create_star(self):
+    def create_star(self, game):
         """Создает звезду (фон)"""
-        star = Entity(id=random.randint(2000, 2999))
-        star.add_component(Transform(
-            pos=np.array([
-                random.uniform(0, 79),
-                random.uniform(0, 39)
-            ], dtype=np.float32)
-        ))
-        star.add_component(Render(
-            is_visible=True,
-            draw_priority=0,
-            texture_id="star"
-        ))
-        star.add_component(Script(
-            on_tick=lambda game: self.update_star(star)
-        ))
-        
-        self.game.add_entity(star)
-        return star
+        pos = np.array([
+            random.uniform(0, 79),
+            random.uniform(0, 39)
+        ], dtype=np.float32)
+        return game.spawn("star", pos=pos)
     
-    def update_player(self, player):
+    def update_player(self, game, player):
         """Обновляет состояние игрока"""
         physics = player.physics
         if physics is None:
@@ -134,18 +122,18 @@ class SpaceShooter:
         
         # Управление с клавиатуры
         move_speed = 8.0
-        if self.game.input.is_pressed('w'):
+        if game.input.is_pressed('w'):
             physics.acceleration[1] = move_speed
-        if self.game.input.is_pressed('s'):
+        if game.input.is_pressed('s'):
             physics.acceleration[1] = -move_speed
-        if self.game.input.is_pressed('a'):
+        if game.input.is_pressed('a'):
             physics.acceleration[0] = -move_speed
-        if self.game.input.is_pressed('d'):
+        if game.input.is_pressed('d'):
             physics.acceleration[0] = move_speed
         
         # Стрельба
-        if self.game.input.is_pressed(' '):
-            self.shoot_bullet(player)
+        if game.input.is_pressed(' '):
+            self.shoot_bullet(game, player)
         
         # Удержание в границах экрана
         transform = player.transform
@@ -160,40 +148,39 @@ class SpaceShooter:
             transform.pos[0] = 1
             physics.velocity[0] = 0
     
-    def shoot_bullet(self, player):
+    def shoot_bullet(self, game, player):
         """Стрельба пулями"""
-        if self.game.tick % 5 != 0:  # Ограничение скорости стрельбы
+        if game.tick % 5 != 0:  # Ограничение скорости стрельбы
             return
         
         player_pos = player.transform.pos
         bullet_velocity = np.array([15.0, 0.0], dtype=np.float32)
         bullet_pos = player_pos + np.array([3.0, 1.0], dtype=np.float32)
         
-        self.create_bullet(bullet_pos, bullet_velocity)
+        self.create_bullet(game, bullet_pos, bullet_velocity)
     
-    def update_bullet(self, bullet):
+    def update_bullet(self, game, bullet):
         """Обновление пули"""
         transform = bullet.transform
         physics = bullet.physics
         
         # Удаляем пулю, если она вышла за экран
         if transform.pos[0] > 82 or transform.pos[0] < -5:
-            self.game.remove_entity(bullet.id)
+            game.despawn(bullet.id)
     
-    def update_enemy(self, enemy):
+    def update_enemy(self, game, enemy):
         """Обновление врага"""
         transform = enemy.transform
         
         # Удаляем врага, если он вышел за левую границу
         if transform.pos[0] < -5:
-            self.game.remove_entity(enemy.id)
-            self.enemies_count -= 1
+            game.despawn(enemy.id)
         
         # Случайное изменение направления по Y
         if random.random() < 0.05:
             enemy.physics.velocity[1] = random.uniform(-1.0, 1.0)
     
-    def update_star(self, star):
+    def update_star(self, game, star):
         """Обновление звезды (движение влево)"""
         transform = star.transform
         transform.pos[0] -= 0.2
@@ -203,43 +190,45 @@ class SpaceShooter:
             transform.pos[0] = 80
             transform.pos[1] = random.uniform(0, 39)
     
-    def on_player_collision(self, player, other):
+    def on_player_collision(self, game, player, other):
         """Обработка столкновения игрока"""
         if "enemy" in str(other.render.texture_id):
-            print("GAME OVER! Final Score:", self.score)
-            self.game.is_running = False
+            game.is_running = False
+            if game is self.game:
+                print("GAME OVER! Final Score:", self.score)
     
-    def on_bullet_collision(self, bullet, other):
+    def on_bullet_collision(self, game, bullet, other):
         """Обработка столкновения пули"""
         if "enemy" in str(other.render.texture_id):
-            self.score += 100
-            self.game.remove_entity(bullet.id)
-            self.game.remove_entity(other.id)
-            self.enemies_count -= 1
+            # Очки ведутся только в основной игре, копии лишь моделируют мир
+            if game is self.game:
+                self.score += 100
+            game.despawn(bullet.id)
+            game.despawn(other.id)
     
-    def on_enemy_collision(self, enemy, other):
+    def on_enemy_collision(self, game, enemy, other):
         """Обработка столкновения врага"""
         pass
     
-    def spawn_enemies(self):
+    def spawn_enemies(self, game):
         """Спавн новых врагов"""
-        if self.enemies_count < self.max_enemies and random.random() < 0.1:
+        if len(game.query("enemy")) < self.max_enemies and random.random() < 0.1:
             pos = np.array([
                 78,  # Правая граница
                 random.uniform(5, 35)
             ], dtype=np.float32)
-            self.create_enemy(pos)
+            self.create_enemy(game, pos)
     
-    def spawn_stars(self):
+    def spawn_stars(self, game):
         """Создание фоновых звезд"""
-        if len([e for e in self.game.entities_list if "star" in str(e.render.texture_id)]) < 30:
-            self.create_star()
+        if len(game.query("star")) < 30:
+            self.create_star(game)
     
     def on_tick(self, game):
         """Вызывается каждый тик игры"""
         self.game_time += 1
-        self.spawn_enemies()
-        self.spawn_stars()
+        self.spawn_enemies(game)
+        self.spawn_stars(game)
         
         # Постепенное увеличение сложности
         if self.game_time % 300 == 0:
@@ -282,11 +271,14 @@ class SpaceShooter:
                 random.uniform(30, 70),
                 random.uniform(5, 35)
             ], dtype=np.float32)
-            self.create_enemy(pos)
+            self.create_enemy(self.game, pos)
         
-        # Создаем фоновые звезды
-        for _ in range(20):
-            self.create_star()
+        # Создаем фоновые звезды одной пачкой
+        positions = np.array([
+            [random.uniform(0, 79), random.uniform(0, 39)]
+            for _ in range(20)
+        ], dtype=np.float32)
+        self.game.spawn_many("star", positions)
         
         print("=== SPACE SHOOTER ===")
         print("Controls: W/A/S/D - Move, SPACE - Shoot, Q/ESC - Quit")
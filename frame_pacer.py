@@ -0,0 +1,107 @@
+from typing import Callable
+import numpy as np
+import time
+
+
+class FramePacer:
+    """Holds the game loop to a fixed frame rate without burning a core.
+
+    Frame deadlines follow a monotonic clock. Most of the wait is spent in
+    `sleep`, requested short of the deadline by the spin threshold plus the
+    measured oversleep of the platform, which is tracked as a moving average
+    of how much longer sleeps actually took than requested. Only the last
+    stretch before the deadline is spun. A loop falling more than a frame
+    behind skips the missed deadlines instead of running frames back to back.
+
+    Attributes:
+        fps: Target frames per second, setting it re-times the current frame.
+        frame_time: Target frame duration in seconds.
+        spin_threshold: Time before a deadline spent spinning, in seconds.
+        oversleep: Current estimate of sleep overshoot, in seconds.
+        frames: Number of frames paced.
+        sleep_time: Total time spent sleeping, in seconds.
+        spin_time: Total time spent spinning, in seconds.
+    """
+    # Weight of the latest measurement in the oversleep average
+    OVERSLEEP_SMOOTHING = 0.1
+
+    def __init__(self, fps: float, spin_threshold: float = 0.001, history: int = 256,
+                 clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        self.last_frame = None
+        self.fps = fps
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+        self.sleep = sleep
+        self.oversleep = 0.0
+        self.frames = 0
+        self.sleep_time = 0.0
+        self.spin_time = 0.0
+        self.frame_times = np.zeros(history)
+        self.deadline = None
+        self.started = None
+
+    @property
+    def fps(self) -> float:
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps: float):
+        self._fps = fps
+        self.frame_time = 1.0 / fps
+        if self.last_frame is not None:
+            self.deadline = self.last_frame + self.frame_time
+
+    def start(self):
+        """Starts pacing from now, the first frame ends a frame time later"""
+        now = self.clock()
+        self.deadline = now + self.frame_time
+        self.last_frame = now
+        self.started = now
+
+    def wait(self):
+        """Blocks until the end of the current frame"""
+        if self.deadline is None: self.start()
+        clock = self.clock
+        now = clock()
+        remaining = self.deadline - now - self.spin_threshold - self.oversleep
+        if remaining > 0:
+            self.sleep(remaining)
+            slept = clock()
+            self.oversleep += self.OVERSLEEP_SMOOTHING * (slept - now - remaining - self.oversleep)
+            self.sleep_time += slept - now
+            now = slept
+        spin_start = now
+        while now < self.deadline:
+            now = clock()
+        self.spin_time += now - spin_start
+
+        self.frame_times[self.frames % len(self.frame_times)] = now - self.last_frame
+        self.frames += 1
+        self.last_frame = now
+        self.deadline += self.frame_time
+        if self.deadline < now:
+            self.deadline = now + self.frame_time
+
+    def stats(self) -> dict[str, float]:
+        """Returns frame time statistics over recent frames.
+
+        Returns:
+            Dictionary with mean, p95 and max frame time and mean absolute
+            deviation from the target (jitter) in milliseconds, effective
+            fps, current oversleep estimate in milliseconds and the share of
+            wall time spent spinning.
+        """
+        times = self.frame_times[:min(self.frames, len(self.frame_times))]
+        if not len(times):
+            return {'frames': 0}
+        elapsed = self.last_frame - self.started
+        return {
+            'frames': self.frames,
+            'mean_ms': float(times.mean() * 1000),
+            'p95_ms': float(np.percentile(times, 95) * 1000),
+            'max_ms': float(times.max() * 1000),
+            'jitter_ms': float(np.abs(times - self.frame_time).mean() * 1000),
+            'fps': float(1 / times.mean()),
+            'oversleep_ms': self.oversleep * 1000,
+            'spin_share': self.spin_time / elapsed if elapsed else 0.0,
+        }
@@ -1,10 +1,20 @@
-from entity import Entity
+from entity import Entity, EntityIds
+from world import Query, World
 from components import *
-from render_systems import SceneRenderSystem
-from physic_system import CollisionSystem, PhysicsSystem
-from pynput import keyboard as kb
+from render_systems import RenderPipeline, SceneRenderSystem
+from texture_atlas import TextureAtlas
+from physic_system import Broadphase, CollisionSystem, PhysicsSystem
+from profiler import Profiler
+from event_system import CollisionEvent, EventBus, Phase
+from frame_pacer import FramePacer
+from region_physics import RegionPhysics
+from snapshot import Snapshot, fork
+from prefab import Prefab, load_prefabs
+import numpy as np
 import time
 from typing import Optional, Callable
+from collections import deque
+from functools import partial
 import threading
 
 class Input:
@@ -12,15 +22,30 @@ class Input:
     
     This class manages keyboard input using pynput, allowing for key binding
     with press/release callbacks, hold functionality, and real-time key state tracking.
+
+    Key transitions coming from the listener (or from `press`/`release`)
+    are queued and applied by `poll`, which the game calls at the start of
+    every frame: key states change and press/release callbacks run on the
+    game thread, at the same point of the loop, so sessions can be
+    recorded and replayed exactly.
+
+    Without a listener (`listen=False`) pynput is not imported and key states
+    are only changed by the program, e.g. in headless games.
     """
     
-    def __init__(self):
-        """Initializes the Input handler with empty key bindings."""
+    def __init__(self, listen: bool = True):
+        """Initializes the Input handler with empty key bindings.
+
+        Args:
+            listen: Whether to start a keyboard listener. Defaults to True.
+        """
         self.keys = {}
         self.keys_pressed = {}
         self.listener = None
-        self.setup_input()
         self.lock = threading.Lock()
+        self.transitions = []
+        if listen:
+            self.setup_input()
         
     def bind_key(self, key: str, on_press: Optional[Callable] = None, 
                  on_release: Optional[Callable] = None, 
@@ -61,46 +86,61 @@ class Input:
     
     def setup_input(self):
         """Initializes and starts the keyboard listener in a daemon thread."""
+        from pynput import keyboard as kb
         self.listener = kb.Listener(
             on_press=self.on_press,
             on_release=self.on_release
         )
         self.listener.daemon = True 
         self.listener.start()
+
+    def _push(self, key_str: Optional[str], pressed: bool):
+        """Queues a transition of a bound key if it changes its state"""
+        if key_str and key_str in self.keys:
+            with self.lock:
+                if self.keys[key_str]['is_pressed'] != pressed:
+                    self.keys[key_str]['is_pressed'] = pressed
+                    self.transitions.append((key_str, pressed))
+
+    def press(self, key: str):
+        """Queues a press of a bound key, applied by the next poll"""
+        self._push(key, True)
+
+    def release(self, key: str):
+        """Queues a release of a bound key, applied by the next poll"""
+        self._push(key, False)
+
+    def poll(self) -> list[tuple[str, bool]]:
+        """Applies queued transitions and fires their callbacks.
+
+        Returns:
+            List of applied (key, pressed) transitions in order.
+        """
+        with self.lock:
+            transitions, self.transitions = self.transitions, []
+        for key, pressed in transitions:
+            binding = self.keys.get(key)
+            if binding is None: continue
+            self.keys_pressed[key] = pressed
+            callback = binding['on_press' if pressed else 'on_release']
+            try:
+                if callback:
+                    callback()
+            except Exception as e:
+                print(f"Error in {'on_press' if pressed else 'on_release'}: {e}")
+        return transitions
     
     def on_press(self, key):
         """Handles key press events from the keyboard listener"""
         try:
-            key_str = self._get_key_string(key)
-            
-            if key_str and key_str in self.keys:
-                with self.lock:
-                    if not self.keys[key_str]['is_pressed']:
-                        self.keys[key_str]['is_pressed'] = True
-                        self.keys_pressed[key_str] = True
-                        
-                        callback = self.keys[key_str]['on_press']
-                        if callback:
-                            callback()
-                            
+            self._push(self._get_key_string(key), True)
         except Exception as e:
             print(f"Error in on_press: {e}")
     
     def on_release(self, key):
         """Handles key release events from the keyboard listener"""
         try:
-            key_str = self._get_key_string(key)
-            
-            if key_str and key_str in self.keys:
-                with self.lock:
-                    if self.keys[key_str]['is_pressed']:
-                        self.keys[key_str]['is_pressed'] = False
-                        self.keys_pressed[key_str] = False
-                        
-                        callback = self.keys[key_str]['on_release']
-                        if callback:
-                            callback()
-                            
+            self._push(self._get_key_string(key), False)
         except Exception as e:
             print(f"Error in on_release: {e}")
     
@@ -147,6 +187,9 @@ class Input:
         """Destructor that ensures the keyboard listener is stopped"""
         self.stop()
     
+_PHASE_SECTIONS = {phase: f'events.{phase.name.lower()}' for phase in Phase}
+
+
 class Game:
     """Main game engine class that manages the game loop, entities, and systems.
     
@@ -155,62 +198,382 @@ class Game:
     
     Attributes:
         resolution: Screen resolution as (width, height) tuple.
-        fps: Target frames per second for rendering.
+        fps: Target frames per second for rendering, can be changed while running.
         tickspeed: Target ticks per second for physics simulation.
         tick: Current tick count.
         frame_count: Current frame count.
         elasticity: Bounciness coefficient for collision resolution.
+        entities: Active entities indexed by ID.
         entities_list: List of all active entities in the game.
+        world: Archetype storage holding components of all active entities.
         on_frame: Optional callback executed each frame.
         on_tick: Optional callback executed each tick.
+        headless: Whether the game runs without keyboard listener and rendering.
         input: Input handler instance.
         physics_system: Physics simulation system.
         collision_system: Collision detection and resolution system.
-        render_system: Rendering system.
+        render_system: Rendering system, None in headless games.
+        render_pipeline: Render thread used when `render_thread` is set, else None.
+        profiler: Profiler timing loop phases and systems, disabled by default.
+        events: Event bus dispatched at the phases of the game loop.
+        pacer: Frame pacer holding `run` to the target fps.
+        region_physics: Multiprocess physics used when `physics_workers` is set, else None.
+        script_factories: Functions creating a Script from (game, entity), by script name.
+        ids: Allocator of engine-generated entity ids.
+        prefabs: Prefabs by name, e.g. read by `load_prefabs`.
+        recorder: InputRecorder logging every frame's ticks and key transitions, or None.
         player: The currently controlled player entity.
         is_running: Flag indicating if the game loop is active.
     """
+    # Subscriber id of the handler forwarding collisions to scripts
+    SCRIPTS_SUBSCRIBER = -1
     
-    def __init__(self, resolution: tuple[int], fps: int, tickspeed: int, elasticity: float = 0.8, on_tick: Optional[Callable] = None, on_frame: Optional[Callable] = None):
+    def __init__(self, resolution: tuple[int], fps: int, tickspeed: int, elasticity: float = 0.8, on_tick: Optional[Callable] = None, on_frame: Optional[Callable] = None,
+                 broadphase: Optional[Broadphase] = None, atlas: Optional[TextureAtlas] = None,
+                 render_thread: bool = False, headless: bool = False, profiler: Optional[Profiler] = None,
+                 physics_workers: int = 0, region_bounds: Optional[list[float]] = None):
+        """Creates a game and its systems.
+
+        Args:
+            resolution: Screen resolution as (width, height) tuple.
+            fps: Target frames per second.
+            tickspeed: Target ticks per second.
+            elasticity: Bounciness coefficient for collision resolution.
+            on_tick: Optional callback executed each tick.
+            on_frame: Optional callback executed each frame.
+            broadphase: Broadphase of the collision system. Defaults to one
+                        based on a CollisionGrid.
+            atlas: Texture atlas. Defaults to textures.json from the working
+                   or engine directory.
+            render_thread: Compose and print frames on a separate thread from
+                           snapshots published at the end of every frame, so
+                           slow terminal output does not take time from the
+                           simulation.
+            headless: Run without keyboard listener and render system, so the
+                      game works without a display or keyboard.
+            profiler: Profiler to time the game with. Defaults to a disabled one.
+            physics_workers: Run integration and collision detection in that
+                             many worker processes, each owning a vertical
+                             strip of the world (see RegionPhysics). Call
+                             `close` to stop them.
+            region_bounds: Inner strip boundaries (x coordinates), one fewer
+                           than workers. Defaults to ones chosen from the
+                           entities' positions.
+        """
         self.resolution = resolution
-        self.fps = fps
+        self.pacer = FramePacer(fps)
         self.tickspeed = tickspeed
         self.tick = 0
         self.frame_count = 0
         self.elasticity = elasticity
-        self.entities_list = []
+        self.entities: dict[int, Entity] = {}
+        self.ids = EntityIds()
+        self.prefabs: dict[str, Prefab] = {}
+        self.world = World()
+        self._commands = deque()
+        self._spawning: dict[int, Entity] = {}
+        self._despawning = set()
+        self._deferred = False
+        self.scripted = self.world.query(Script)
         self.on_frame = on_frame
         self.on_tick = on_tick
+        self.headless = headless
+        self.player = None
+        self.is_running = False
+        self.profiler = Profiler() if profiler is None else profiler
+        self.events = EventBus()
+        self.script_factories: dict[str, Callable] = {}
+        self.recorder = None
+        self._frame_start = 0
+        self._transitions = []
+        self.events.subscribe(self.SCRIPTS_SUBSCRIBER, Phase.REACTION, CollisionEvent, self._on_collision)
 
-        self.input = Input()
+        self.input = Input(listen=not headless)
         self.physics_system = PhysicsSystem()
-        self.collision_system = CollisionSystem(cell_size=(3, 3))
-        self.render_system = SceneRenderSystem(resolution)
+        self.collision_system = CollisionSystem(cell_size=(3, 3), broadphase=broadphase)
+        self.render_system = None if headless else SceneRenderSystem(resolution, atlas)
+        self.region_physics = RegionPhysics(physics_workers, region_bounds, self.collision_system) if physics_workers else None
+        self.render_pipeline = RenderPipeline(self.render_system, profiler=self.profiler) if render_thread and not headless else None
+
+    @property
+    def fps(self) -> float:
+        """Target frames per second, kept by the pacer so `run` follows changes"""
+        return self.pacer.fps
+
+    @fps.setter
+    def fps(self, fps: float):
+        self.pacer.fps = fps
+
+    @property
+    def entities_list(self) -> list[Entity]:
+        """List of all active entities in the game"""
+        return list(self.entities.values())
 
     def add_entity(self, entity: Entity):
-        """Adds an entity to the game world"""
-        self.entities_list.append(entity)
-        if entity.script is not None: entity.script.on_init(self)
+        """Adds an entity to the game world (at the next sync point while running)"""
+        if entity.id in self.entities or entity.id in self._spawning:
+            raise ValueError(f'Entity with id {entity.id} already exists')
+        if self._deferred:
+            self._spawning[entity.id] = entity
+            self._commands.append((self._add_now, entity))
+        else:
+            self._add_now(entity)
         return self
     
+    def new_id(self) -> int:
+        """Returns an engine-generated id no current entity has.
+
+        Ids carry a generation counter, so an id kept after its entity is
+        gone never finds the entity reusing its handle or index; code
+        holding on to entities should keep ids, not handles.
+        """
+        id = self.ids.allocate()
+        while id in self.entities or id in self._spawning:
+            id = self.ids.allocate()
+        return id
+
+    def load_prefabs(self, filename: str = 'prefabs.json'):
+        """Adds prefabs from a JSON file, see prefab.load_prefabs"""
+        self.prefabs.update(load_prefabs(filename))
+        return self
+
+    def _prefab(self, prefab) -> Prefab:
+        if isinstance(prefab, Prefab): return prefab
+        found = self.prefabs.get(prefab)
+        if found is None:
+            raise ValueError(f'Unknown prefab {prefab!r}')
+        return found
+
+    def _script_factory(self, prefab: Prefab) -> Callable:
+        factory = self.script_factories.get(prefab.script)
+        if factory is None:
+            raise ValueError(f'No script registered as {prefab.script!r}')
+        return factory
+
+    def spawn(self, prefab, pos: Optional[np.ndarray] = None, velocity: Optional[np.ndarray] = None,
+              **values) -> Entity:
+        """Creates an entity from a prefab (at the next sync point while running).
+
+        High-churn entities such as bullets should be created with `spawn`
+        and removed with `despawn`, which pools their handles per archetype.
+        A handle despawned from the prefab's archetype is reused with its
+        script if there is one, otherwise a new handle is made. Either way
+        the entity gets a new id and is initialized once it is added, by
+        Prefab.on_spawn if set, else by Script.on_init.
+
+        Args:
+            prefab: Template of the entity, or name of one in `prefabs`.
+            pos: Position, defaults to the prefab's.
+            velocity: Velocity, defaults to the prefab's.
+            **values: Other component fields overriding the prefab's defaults.
+
+        Returns:
+            The spawned entity.
+        """
+        prefab = self._prefab(prefab)
+        archetype = self.world.archetype(prefab.signature)
+        entity = archetype.pool.pop() if archetype.pool else Entity(-1)
+        entity.id = self.new_id()
+        values = dict(prefab.values, **values)
+        # Copied now, a queued spawn must not see later writes to the caller's arrays
+        if pos is not None: values['pos'] = np.array(pos, dtype=np.float32)
+        if velocity is not None: values['velocity'] = np.array(velocity, dtype=np.float32)
+        if prefab.script is not None:
+            script = entity.components_dict.get(Script)
+            if script is None or script.name != prefab.script:
+                script = self._script_factory(prefab)(self, entity)
+            values['script'] = script
+        entity.components_dict = {}
+        if self._deferred:
+            self._spawning[entity.id] = entity
+            self._commands.append((partial(self._spawn_now, prefab, values), entity))
+        else:
+            self._spawn_now(prefab, values, entity)
+        return entity
+
+    def spawn_many(self, prefab, positions: np.ndarray, velocities: Optional[np.ndarray] = None,
+                   **values) -> list[Entity]:
+        """Creates a batch of entities from a prefab (at the next sync point while running).
+
+        The batch is written into storage as one block of rows, reusing
+        pooled handles first like `spawn`. It is initialized by a single
+        Prefab.on_spawn call if set, else by Script.on_init of every entity.
+
+        Args:
+            prefab: Template of the entities, or name of one in `prefabs`.
+            positions: (n, 2) positions, one per entity.
+            velocities: (n, 2) velocities. Defaults to the prefab's.
+            **values: Other component fields overriding the prefab's defaults,
+                      as one value for all or an array with one row per entity.
+
+        Returns:
+            The spawned entities.
+        """
+        prefab = self._prefab(prefab)
+        # Copied now, a queued batch must not see later writes to the caller's arrays
+        positions = np.array(positions, dtype=np.float32).reshape(-1, 2)
+        n = len(positions)
+        pool = self.world.archetype(prefab.signature).pool
+        reused = pool[len(pool) - min(n, len(pool)):]
+        del pool[len(pool) - len(reused):]
+        ids = self.ids.allocate_many(n)
+        if self.entities.keys() & ids or self._spawning.keys() & ids:
+            ids = [self.new_id() if id in self.entities or id in self._spawning else id for id in ids]
+        for entity, id in zip(reused, ids):
+            entity.id = id
+        entities = reused + [Entity(id) for id in ids[len(reused):]]
+
+        values = dict(prefab.values, **values, pos=positions)
+        if velocities is not None: values['velocity'] = np.array(velocities, dtype=np.float32)
+        if prefab.script is not None:
+            scripts = np.empty(n, dtype=object)
+            factory = None
+            for i, entity in enumerate(entities):
+                script = entity.components_dict.get(Script)
+                if script is None or script.name != prefab.script:
+                    factory = factory or self._script_factory(prefab)
+                    script = factory(self, entity)
+                scripts[i] = script
+            values['script'] = scripts
+        for entity in reused:
+            entity.components_dict = {}
+
+        if self._deferred:
+            for entity in entities:
+                self._spawning[entity.id] = entity
+            self._commands.append((partial(self._spawn_many_now, prefab, values), entities))
+        else:
+            self._spawn_many_now(prefab, values, entities)
+        return entities
+
     def get_entity(self, id: int) -> Optional[Entity]:
-        """Retrieves an entity by ID"""
-        for e in self.entities_list:
-            if e.id == id: return e
-        return None
+        """Retrieves an entity by ID, including ones waiting to be added"""
+        entity = self.entities.get(id)
+        return self._spawning.get(id) if entity is None else entity
     
+    def query(self, *terms) -> Query:
+        """Returns live set of entities with all given component types and tags.
+
+        Example: `game.query(Transform, Physics)` or `game.query('star')`.
+        Results are maintained incrementally, `len()` is cheap.
+        """
+        return self.world.query(*terms)
+
     def set_player(self, entity: Entity):
         """Sets an entity as the player-controlled character"""
         if entity.transform is None: 
             return
-        self.render_system.set_target(entity)
+        if self.render_system is not None:
+            self.render_system.set_target(entity)
         self.player = entity
 
+    def register_script(self, name: str, factory: Callable):
+        """Registers a function returning the Script named `name` for an entity.
+
+        The factory is called as `factory(game, entity)` with the game the
+        entity is created in, which scripts should act on (a fork shares
+        the factories but not the game). The created Script should carry the
+        same name, so that snapshots of the entity can re-attach it.
+        """
+        self.script_factories[name] = factory
+        return self
+
+    def snapshot(self) -> Snapshot:
+        """Returns an in-memory columnar copy of all entities"""
+        return Snapshot.capture(self)
+
+    def save_snapshot(self, filename: str):
+        """Writes all entities to a binary snapshot file"""
+        self.snapshot().save(filename)
+
+    def restore_snapshot(self, source):
+        """Adds all entities of a Snapshot or snapshot file to this empty game.
+
+        Scripts are re-attached by their name from factories registered
+        with `register_script`.
+        """
+        if not isinstance(source, Snapshot):
+            source = Snapshot.load(source)
+        source.restore(self)
+        return self
+
+    def fork(self, **kwargs) -> 'Game':
+        """Returns an independent headless copy of the game, see snapshot.fork"""
+        return fork(self, **kwargs)
+
     def remove_entity(self, id: int):
-        """Removes an entity from game world by ID"""
-        for e in self.entities_list:
-            if e.script is not None: e.script.on_remove(self)
-            if e.id == id: self.entities_list.remove(e)
+        """Removes an entity from game world by ID (at the next sync point while running)"""
+        self._remove(id, pool=False)
+
+    def despawn(self, id: int):
+        """Removes an entity by ID and pools its handle for `spawn` (at the next sync point while running).
+
+        The handle must not be used afterwards, it is reused by a later spawn.
+        """
+        self._remove(id, pool=True)
+
+    def _remove(self, id: int, pool: bool):
+        entity = self.get_entity(id)
+        if entity is None or id in self._despawning: return
+        if self._deferred:
+            self._despawning.add(id)
+            self._commands.append((partial(self._remove_now, pool=pool), entity))
+        else:
+            self._remove_now(entity, pool)
+
+    def _add_now(self, entity: Entity):
+        self._spawning.pop(entity.id, None)
+        self.world.add(entity)
+        self.entities[entity.id] = entity
+        if entity.script is not None: entity.script.on_init(self)
+
+    def _spawn_now(self, prefab: Prefab, values: dict, entity: Entity):
+        self._spawning.pop(entity.id, None)
+        self.world.insert(entity, prefab.signature, values)
+        self.entities[entity.id] = entity
+        if prefab.on_spawn is not None:
+            prefab.on_spawn(self, [entity])
+        elif prefab.script is not None:
+            values['script'].on_init(self)
+
+    def _spawn_many_now(self, prefab: Prefab, values: dict, entities: list[Entity]):
+        if not entities: return
+        spawning = self._spawning
+        if spawning:
+            for entity in entities: spawning.pop(entity.id, None)
+        self.world.add_many(entities, prefab.signature, values)
+        self.entities.update((entity.id, entity) for entity in entities)
+        if prefab.on_spawn is not None:
+            prefab.on_spawn(self, entities)
+        elif prefab.script is not None:
+            for script in values['script'].tolist():
+                script.on_init(self)
+
+    def _remove_now(self, entity: Entity, pool: bool = False):
+        self._despawning.discard(entity.id)
+        if self.entities.get(entity.id) is not entity: return
+        if entity.script is not None: entity.script.on_remove(self)
+        del self.entities[entity.id]
+        self.ids.release(entity.id)
+        self.collision_system.remove_entity(entity)
+        if self.render_system is not None:
+            self.render_system.remove_entity(entity)
+        if pool:
+            self.world.release(entity)
+        else:
+            self.world.remove(entity)
+
+    def apply_pending(self):
+        """Sync point: applies queued entity additions and removals in order.
+
+        While the game loop runs, entities added or removed by callbacks are
+        queued and applied at sync points between loop phases, so systems
+        never see the entity set change under them. Outside the loop changes
+        apply immediately.
+        """
+        while self._commands:
+            command, entity = self._commands.popleft()
+            command(entity)
 
     def run(self):
         """Starts the main game loop.
@@ -218,52 +581,226 @@ class Game:
         The loop follows a fixed timestep pattern for physics simulation
         with variable rendering frames. It continuously updates physics,
         processes collisions, and renders frames until the game is stopped.
+
+        Events emitted to `events` are dispatched once per frame for
+        Phase.INPUT (before the frame callback) and Phase.RENDER (after frame
+        scripts), and every tick for Phase.SIMULATION (after collisions) and
+        Phase.REACTION (right after SIMULATION). Loop phases, systems and
+        callbacks are timed by `profiler` once it is enabled.
         """
-        last_time = time.time()
+        last_time = time.perf_counter()
         tick_accumulator = 0
         fixed_delta_time = 1 / self.tickspeed
         self.is_running = True
+        self._deferred = True
+        if self.render_pipeline is not None:
+            self.render_pipeline.start()
+        self.pacer.start()
     
-        while self.is_running:
-            current_time = time.time()
-            delta_time = current_time - last_time
-            last_time = current_time
-            tick_accumulator += delta_time
+        try:
+            while self.is_running:
+                current_time = time.perf_counter()
+                delta_time = current_time - last_time
+                last_time = current_time
+                tick_accumulator += delta_time
+                section = self.profiler.section
         
-            if self.on_tick is not None: 
-                self.on_tick(self)
+                with section('frame'):
+                    self._begin_frame()
+                    while tick_accumulator >= fixed_delta_time:
+                        self._tick(fixed_delta_time)
+                        tick_accumulator -= fixed_delta_time
         
-            while tick_accumulator >= fixed_delta_time:
-                self.tick += 1
-            
-                self.collision_system.collision_grid.set_cells_table(self.entities_list)
-                self.physics_system.update(self.entities_list, fixed_delta_time, self.collision_system)
-                self.collision_system.process_collision(self.entities_list)
+                    tick_accumulator = min(0.2, tick_accumulator)
 
-                for e in self.entities_list:
-                    if e.script is not None: e.script.on_tick(self)
-            
-                tick_accumulator -= fixed_delta_time
+                    self._end_frame()
+                    if self.render_system is not None:
+                        with section('render'):
+                            self._present()
         
-            tick_accumulator = min(0.2, tick_accumulator)
+                with section('sleep'):
+                    self.pacer.wait()
+        finally:
+            if self.render_pipeline is not None:
+                self.render_pipeline.stop()
+            self._deferred = False
+            self.apply_pending()
 
-            self.frame_count += 1
-            if self.on_frame is not None: 
+    def step(self, n_ticks: int = 1):
+        """Advances the simulation by n fixed ticks without pacing or rendering.
+
+        Ticks are grouped into frames of `tickspeed / fps` ticks, so frame
+        callbacks run as often as in `run` relative to simulation time.
+
+        Args:
+            n_ticks: Number of ticks to simulate. Defaults to 1.
+
+        Returns:
+            self: Allows for method chaining.
+        """
+        self.run_until(lambda game: False, max_ticks=n_ticks)
+        return self
+
+    def run_until(self, condition: Callable, max_ticks: Optional[int] = None) -> int:
+        """Advances the simulation frame by frame until a condition holds.
+
+        The condition is checked before every frame. Like `step`, no time is
+        spent on pacing or rendering, e.g. for batch simulation and tests of
+        headless games. Setting `is_running` to False from a callback stops
+        the simulation as well.
+
+        Args:
+            condition: Function taking the game, returning True to stop.
+            max_ticks: Upper bound on simulated ticks. Defaults to no bound.
+
+        Returns:
+            Number of ticks simulated.
+        """
+        fixed_delta_time = 1 / self.tickspeed
+        ticks_per_frame = max(1, round(self.tickspeed / self.fps))
+        ticks = 0
+        self.is_running = True
+        self._deferred = True
+        try:
+            while self.is_running and (max_ticks is None or ticks < max_ticks) and not condition(self):
+                frame_ticks = ticks_per_frame if max_ticks is None else min(ticks_per_frame, max_ticks - ticks)
+                with self.profiler.section('frame'):
+                    self._begin_frame()
+                    for _ in range(frame_ticks):
+                        self._tick(fixed_delta_time)
+                    ticks += frame_ticks
+                    self._end_frame()
+        finally:
+            self.is_running = False
+            self._deferred = False
+            self.apply_pending()
+        return ticks
+
+    def step_frame(self, n_ticks: int):
+        """Runs one frame of exactly n fixed ticks without pacing or rendering.
+
+        Key transitions are applied once per frame, before Phase.INPUT is
+        dispatched. An attached InputRecorder logs them with the number of
+        ticks of every frame, and Replay feeds such a log back through this
+        method, reproducing a session tick for tick (see replay.py).
+
+        Args:
+            n_ticks: Number of ticks simulated in the frame.
+
+        Returns:
+            self: Allows for method chaining.
+        """
+        fixed_delta_time = 1 / self.tickspeed
+        deferred, self._deferred = self._deferred, True
+        try:
+            with self.profiler.section('frame'):
+                self._begin_frame()
+                for _ in range(n_ticks):
+                    self._tick(fixed_delta_time)
+                self._end_frame()
+        finally:
+            self._deferred = deferred
+            if not deferred: self.apply_pending()
+        return self
+
+    def close(self):
+        """Stops physics workers and the keyboard listener"""
+        self.collision_system.broadphase.close()
+        if self.region_physics is not None:
+            self.region_physics.close()
+        self.input.stop()
+
+    def _dispatch(self, phase: Phase):
+        with self.profiler.section(_PHASE_SECTIONS[phase]):
+            self.events.dispatch(phase)
+
+    def _begin_frame(self):
+        section = self.profiler.section
+        self._frame_start = self.tick
+        with section('input'):
+            self._transitions = self.input.poll()
+        self._dispatch(Phase.INPUT)
+        if self.on_tick is not None: 
+            with section('on_tick'):
+                self.on_tick(self)
+        with section('sync'):
+            self.apply_pending()
+
+    def _tick(self, fixed_delta_time: float):
+        """Simulates one fixed tick"""
+        self.tick += 1
+        section = self.profiler.section
+
+        with section('tick'):
+            if self.region_physics is not None:
+                with section('physics.regions'):
+                    contacts = self.region_physics.update(self.world, fixed_delta_time, notify=False)
+            else:
+                with section('physics'):
+                    self.physics_system.update(self.world, fixed_delta_time)
+                with section('collision'):
+                    contacts = self.collision_system.process_collision(self.world, notify=False)
+            if len(contacts):
+                self.events.emit(Phase.REACTION, CollisionEvent(
+                    contacts.entities, contacts.pairs, contacts.normals, contacts.penetrations, self.tick))
+            self._dispatch(Phase.SIMULATION)
+            self._dispatch(Phase.REACTION)
+            with section('sync'):
+                self.apply_pending()
+
+            with section('scripts.on_tick'):
+                self._run_scripts('on_tick')
+            with section('sync'):
+                self.apply_pending()
+
+    def _end_frame(self):
+        self.frame_count += 1
+        section = self.profiler.section
+        if self.on_frame is not None: 
+            with section('on_frame'):
                 self.on_frame(self)
-            for e in self.entities_list:
-                if e.script is not None: e.script.on_frame(self)
-            self.render_system.print_screen(self.entities_list)
-        
-            self._limit_fps(current_time)
+        with section('scripts.on_frame'):
+            self._run_scripts('on_frame')
+        self._dispatch(Phase.RENDER)
+        with section('sync'):
+            self.apply_pending()
+        if self.recorder is not None:
+            self.recorder.record_frame(self.tick - self._frame_start, self._transitions)
 
-    def _limit_fps(self, current_time):
-        """Accurately limits the frame rate to the target FPS"""
-        target_frame_time = 1.0 / self.fps
-        elapsed = time.time() - current_time
-    
-        if elapsed < target_frame_time:
-            sleep_time = target_frame_time - elapsed
-            if sleep_time > 0.001:
-                time.sleep(sleep_time * 0.9)
-            while time.time() - current_time < target_frame_time:
-                pass
\ No newline at end of file
+    def _on_collision(self, event: CollisionEvent):
+        """Fires Script.on_collision of both entities of every collision.
+
+        Subscribed as SCRIPTS_SUBSCRIBER to the CollisionEvent of every tick,
+        published in the REACTION phase.
+        """
+        for e1, e2 in event.entity_pairs():
+            if e1.script is not None: e1.script.on_collision(e1, e2)
+            if e2.script is not None: e2.script.on_collision(e2, e1)
+
+    def _run_scripts(self, callback: str):
+        """Calls a script callback of every scripted entity.
+
+        With `profiler.enable(scripts=True)` each call is timed, named by
+        callback and script name with the entity id in the trace args.
+        """
+        profiler = self.profiler
+        if profiler.enabled and profiler.scripts:
+            for e in self.scripted:
+                # Named by callback and script, the entity id goes to the record
+                name = callback if e.script.name is None else f'{callback} {e.script.name}'
+                with profiler.section(name, e.id):
+                    getattr(e.script, callback)(self)
+        elif callback == 'on_tick':
+            for e in self.scripted:
+                e.script.on_tick(self)
+        else:
+            for e in self.scripted:
+                e.script.on_frame(self)
+
+    def _present(self):
+        """Prints the frame, or hands its snapshot to the render thread"""
+        renderables = self.world.query(Transform, Render)
+        if self.render_pipeline is None:
+            self.render_system.print_screen(renderables)
+        else:
+            self.render_pipeline.publish(self.render_system.snapshot(renderables, self.frame_count))
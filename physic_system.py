@@ -1,38 +1,100 @@
 from components import *
 from entity import *
+from world import World
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import numpy as np
+import os
 
 
 class CollisionGrid:
-    """Simple spatial grid for optimization"""
+    """Spatial grid for optimization, maintained incrementally.
+
+    Every entity is bucketed into all cells covered by its AABB. Entities are
+    only re-bucketed when their covered cell range changes.
+    """
+    # Range stored for slots which are not in the grid
+    NO_RANGE = np.iinfo(np.int64).min
+
     def __init__(self, cell_size: tuple[int]):
         self.cell_size = np.array(cell_size)
         self.cells_table = {}
         self.entities_table = {}
+        self.slot_ranges = np.full((0, 4), self.NO_RANGE, dtype=np.int64)
+
+    def cell_ranges(self, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+        """Returns (n, 4) array of covered cells as (start_x, start_y, end_x, end_y), end is exclusive"""
+        start = np.floor_divide(mins, self.cell_size).astype(np.int64)
+        end = np.floor_divide(maxs, self.cell_size).astype(np.int64) + 1
+        return np.concatenate((start, end), axis=1)
 
     def _get_cell_keys(self, entity: Entity):
         """Marks up spatial grid"""
         if entity.collider is None: return
-        start = entity.transform.pos // self.cell_size
-        end = (entity.transform.pos + np.array((entity.collider.hitbox_x, entity.collider.hitbox_y))) // self.cell_size + 1
-        start, end = start.astype(int), end.astype(int)
+        pos = entity.transform.pos
+        size = np.array((entity.collider.hitbox_x, entity.collider.hitbox_y))
+        yield from self._range_cells(self.cell_ranges(pos[None], (pos + size)[None])[0])
 
-        for cell_y in range(start[1], end[1]):
-            for cell_x in range(start[0], end[0]): 
+    @staticmethod
+    def _range_cells(cell_range):
+        for cell_y in range(cell_range[1], cell_range[3]):
+            for cell_x in range(cell_range[0], cell_range[2]):
                 yield (cell_x, cell_y)
 
+    def _ensure_slots(self, size: int):
+        if size <= len(self.slot_ranges): return
+        ranges = np.full((max(size, 2 * len(self.slot_ranges)), 4), self.NO_RANGE, dtype=np.int64)
+        ranges[:len(self.slot_ranges)] = self.slot_ranges
+        self.slot_ranges = ranges
+
+    def _insert(self, entity: Entity, cells):
+        self.entities_table[entity] = cells
+        for k in cells:
+            cell = self.cells_table.get(k)
+            if cell is None: self.cells_table[k] = cell = {}
+            cell[entity] = None
+
+    def remove(self, entity: Entity):
+        """Evicts entity from the grid"""
+        cells = self.entities_table.pop(entity, None)
+        if cells is None: return
+        for k in cells:
+            cell = self.cells_table[k]
+            del cell[entity]
+            if not cell: del self.cells_table[k]
+        if 0 <= entity._slot < len(self.slot_ranges):
+            self.slot_ranges[entity._slot] = self.NO_RANGE
+
+    def update(self, entities: list[Entity], slots: np.ndarray, mins: np.ndarray, maxs: np.ndarray):
+        """Re-buckets entities whose covered cell range has changed (or which are new)"""
+        if len(slots) == 0: return
+        ranges = self.cell_ranges(mins, maxs)
+        self._ensure_slots(int(slots.max()) + 1)
+        changed = np.flatnonzero((self.slot_ranges[slots] != ranges).any(axis=1))
+        for k in changed:
+            e = entities[k]
+            self.remove(e)
+            self._insert(e, list(self._range_cells(ranges[k].tolist())))
+        self.slot_ranges[slots[changed]] = ranges[changed]
+
     def set_cells_table(self, entities: list[Entity]):
-        """Sets dictionaries with entities and their cells"""
+        """Rebuilds dictionaries with entities and their cells from scratch"""
         self.cells_table = {}
         self.entities_table = {}
-        
+        self.slot_ranges[:] = self.NO_RANGE
+
         for e in entities:
-            if self.entities_table.get(e) is None: self.entities_table[e] = []
-            for k in self._get_cell_keys(e):
-                if self.cells_table.get(k) is None: self.cells_table[k] = []
-                self.cells_table[k].append(e)
-                self.entities_table[e].append(k)
-    
+            self._insert(e, list(self._get_cell_keys(e)))
+
+    def query_rect(self, mins: np.ndarray, maxs: np.ndarray) -> list[Entity]:
+        """Returns entities bucketed in cells overlapping the rectangle (may include ones just outside)"""
+        cell_range = self.cell_ranges(np.asarray(mins)[None], np.asarray(maxs)[None])[0].tolist()
+        found = {}
+        for k in self._range_cells(cell_range):
+            cell = self.cells_table.get(k)
+            if cell is not None: found.update(cell)
+        return list(found)
+
     def get_nearby(self, entity: Entity): 
         """Returns nearby entities with entity"""
         nearby_entities = set()
@@ -47,10 +109,286 @@ class CollisionGrid:
                         if e != entity and not e in nearby_entities: nearby_entities.add(e)
         return list(nearby_entities)
 
+class Bodies:
+    """Collider bodies gathered from World columns for one collision pass.
+
+    Attributes:
+        entities: Entity handles by body index.
+        pos: Copy of positions (min corners of AABBs).
+        size: Hitbox sizes.
+        active: Mask of bodies which participate in collision detection.
+        dynamic: Mask of bodies which have Physics (movers).
+        velocity: Copy of velocities, zero for bodies without Physics.
+        inv_mass: Inverse masses, zero for bodies without Physics.
+        slots: World slots of bodies.
+        segments: (archetype, start, stop) ranges used to write results back.
+    """
+
+    def __init__(self, world: World):
+        self.world = world
+        self.entities = []
+        self.segments = []
+        pos, size, active, dynamic, slots, velocity, inv_mass = [], [], [], [], [], [], []
+        start = 0
+        for a in world.archetypes_with(Transform, Collider):
+            if a.count == 0: continue
+            self.entities.extend(a.entities)
+            self.segments.append((a, start, start + a.count))
+            start += a.count
+            pos.append(a.view('pos'))
+            size.append(np.stack((a.view('hitbox_x'), a.view('hitbox_y')), axis=1))
+            active.append(a.view('has_collision'))
+            dynamic.append(np.full(a.count, Physics in a.signature))
+            slots.append(a.view('slot'))
+            if Physics in a.signature:
+                velocity.append(a.view('velocity'))
+                inv_mass.append(1 / a.view('mass'))
+            else:
+                velocity.append(np.zeros((a.count, 2), dtype=np.float32))
+                inv_mass.append(np.zeros(a.count))
+        self.count = start
+        self.pos = np.concatenate(pos) if pos else np.zeros((0, 2), dtype=np.float32)
+        self.size = np.concatenate(size).astype(np.float32) if size else np.zeros((0, 2), dtype=np.float32)
+        self.active = np.concatenate(active) if active else np.zeros(0, dtype=bool)
+        self.dynamic = np.concatenate(dynamic) if dynamic else np.zeros(0, dtype=bool)
+        self.slots = np.concatenate(slots) if slots else np.zeros(0, dtype=np.int64)
+        self.velocity = np.concatenate(velocity) if velocity else np.zeros((0, 2), dtype=np.float32)
+        self.inv_mass = np.concatenate(inv_mass) if inv_mass else np.zeros(0)
+
+    def write_back(self, indices: np.ndarray):
+        """Stores positions and velocities of given bodies back to the world"""
+        indices = np.unique(indices)
+        self.world.mark_dirty(self.slots[indices])
+        for a, start, stop in self.segments:
+            lo, hi = np.searchsorted(indices, (start, stop))
+            if lo == hi: continue
+            k = indices[lo:hi]
+            a.view('pos')[k - start] = self.pos[k]
+            if Physics in a.signature:
+                a.view('velocity')[k - start] = self.velocity[k]
+
+    @property
+    def mins(self) -> np.ndarray:
+        return self.pos
+
+    @property
+    def maxs(self) -> np.ndarray:
+        return self.pos + self.size
+
+
+class Contacts:
+    """Result of a batched narrowphase.
+
+    Attributes:
+        pairs: (k, 2) body indices of colliding pairs.
+        normals: (k, 2) collision normals pointing from first to second body.
+        penetrations: (k,) penetration depths along the normals.
+        entities: Entity handles by body index, if known.
+    """
+
+    def __init__(self, pairs: np.ndarray, normals: np.ndarray, penetrations: np.ndarray,
+                 entities: Optional[list[Entity]] = None):
+        self.pairs = pairs
+        self.normals = normals
+        self.penetrations = penetrations
+        self.entities = entities
+
+    def __len__(self):
+        return len(self.pairs)
+
+
+def _sorted_pairs(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Builds a (k, 2) array of unique pairs with i < j in lexicographic order"""
+    pairs = np.stack((np.minimum(first, second), np.maximum(first, second)), axis=1)
+    if len(pairs) == 0: return pairs.reshape(0, 2).astype(np.intp)
+    return np.unique(pairs, axis=0).astype(np.intp)
+
+
+def sweep_pairs(mins: np.ndarray, maxs: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Sort and sweep over AABBs, returns sorted pairs of `index` entries whose AABBs overlap"""
+    order = np.argsort(mins[:, 0], kind='stable')
+    mins, maxs = mins[order], maxs[order]
+
+    # Every body after i in sorted order whose min x <= max x of i overlaps it on x
+    n = len(order)
+    end = np.searchsorted(mins[:, 0], maxs[:, 0], side='right')
+    counts = np.maximum(end - np.arange(1, n + 1), 0)
+    first = np.repeat(np.arange(n), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + offsets
+
+    overlap_y = (mins[first, 1] <= maxs[second, 1]) & (mins[second, 1] <= maxs[first, 1])
+    first, second = first[overlap_y], second[overlap_y]
+    return _sorted_pairs(index[order[first]], index[order[second]])
+
+
+class Broadphase:
+    """Base class for broadphase algorithms.
+
+    A broadphase receives gathered Bodies and returns candidate pairs of
+    body indices whose AABBs may overlap. Only active bodies are paired.
+    """
+
+    def find_pairs(self, bodies: Bodies) -> np.ndarray:
+        """Returns (k, 2) int array of candidate pairs (i < j)"""
+        raise NotImplementedError
+
+    def remove(self, entity: Entity):
+        """Called before entity leaves the world, for broadphases keeping state"""
+
+    def close(self):
+        """Releases resources such as worker threads"""
+
+
+class GridBroadphase(Broadphase):
+    """Broadphase on top of an incrementally updated CollisionGrid.
+
+    Movers (bodies with Physics) are re-checked every pass, static bodies only
+    when the world reports them as changed, so maintenance cost follows the
+    movers. Candidates are bodies sharing a cell with a mover.
+    """
+
+    def __init__(self, cell_size: tuple[int] = (2, 2)):
+        self.grid = CollisionGrid(cell_size)
+        self.world = None
+        self.tracker = None
+
+    def remove(self, entity: Entity):
+        self.grid.remove(entity)
+
+    def _sync(self, bodies: Bodies):
+        check = bodies.dynamic.copy()
+        if self.world is not bodies.world:
+            self.world, self.tracker = bodies.world, bodies.world.track()
+            check[:] = True
+        changed = self.tracker.take()
+        if len(changed):
+            last_slot = int(bodies.slots.max()) if bodies.count else -1
+            body_of_slot = np.full(max(last_slot, int(changed.max())) + 1, -1, dtype=np.intp)
+            body_of_slot[bodies.slots] = np.arange(bodies.count)
+            changed_bodies = body_of_slot[changed]
+            check[changed_bodies[changed_bodies >= 0]] = True
+            # Live entities which are no longer bodies (lost Collider or Transform) leave the grid
+            slot_entities = bodies.world.slot_entities
+            for slot in changed[changed_bodies < 0].tolist():
+                entity = slot_entities[slot] if slot < len(slot_entities) else None
+                if entity is not None: self.grid.remove(entity)
+
+        for k in np.flatnonzero(check & ~bodies.active):
+            self.grid.remove(bodies.entities[k])
+        update = np.flatnonzero(check & bodies.active)
+        if len(update) == len(bodies.entities):
+            entities = bodies.entities
+        else:
+            entities = [bodies.entities[k] for k in update]
+        self.grid.update(entities, bodies.slots[update], bodies.mins[update], bodies.maxs[update])
+
+    def find_pairs(self, bodies: Bodies) -> np.ndarray:
+        self._sync(bodies)
+        starts = {a: start for a, start, _ in bodies.segments}
+        first, second = [], []
+        cells_table, entities_table = self.grid.cells_table, self.grid.entities_table
+        for k in np.flatnonzero(bodies.dynamic & bodies.active):
+            e1 = bodies.entities[k]
+            for cell in entities_table[e1]:
+                for e2 in cells_table[cell]:
+                    if e2 is e1: continue
+                    first.append(k)
+                    second.append(starts[e2._archetype] + e2._row)
+        return _sorted_pairs(np.array(first, dtype=np.intp), np.array(second, dtype=np.intp))
+
+
+class SortAndSweepBroadphase(Broadphase):
+    """Sorts AABBs by min x and sweeps for x-overlaps, then filters them by y"""
+
+    def find_pairs(self, bodies: Bodies) -> np.ndarray:
+        idx = np.flatnonzero(bodies.active)
+        return sweep_pairs(bodies.mins[idx], bodies.maxs[idx], idx)
+
+
+class ParallelSweepBroadphase(Broadphase):
+    """Sort and sweep over blocks of grid cells, run in a thread pool.
+
+    Active bodies are assigned to every block their AABB touches and each
+    block is swept separately; NumPy sorting and comparisons release the GIL,
+    so blocks are processed in parallel. A pair is kept only by the block
+    holding the min corner of the overlap of its AABBs and at least one body
+    must be a mover. Pairs of all blocks are merged and deduplicated with
+    np.unique, so the result does not depend on scheduling.
+
+    Attributes:
+        block_size: Size of a block in world units.
+        workers: Number of threads, defaults to the number of CPUs.
+        min_bodies: Below this many active bodies blocks are swept inline.
+    """
+
+    def __init__(self, block_size: tuple[float] = (32, 32), workers: Optional[int] = None,
+                 min_bodies: int = 1024):
+        self.block_size = np.asarray(block_size, dtype=np.float64)
+        self.workers = os.cpu_count() if workers is None else workers
+        self.min_bodies = min_bodies
+        self.executor = None
+
+    def close(self):
+        """Stops the thread pool"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _blocks(self, mins: np.ndarray, maxs: np.ndarray) -> tuple[np.ndarray, list[np.ndarray]]:
+        """Returns keys of touched blocks and indices of bodies in each of them"""
+        lo = np.floor(mins / self.block_size).astype(np.int64)
+        hi = np.floor(maxs / self.block_size).astype(np.int64)
+        span = hi - lo + 1
+        counts = span[:, 0] * span[:, 1]
+        body = np.repeat(np.arange(len(mins)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        bx = lo[body, 0] + k % span[body, 0]
+        by = lo[body, 1] + k // span[body, 0]
+        keys = np.stack((bx, by), axis=1)
+        order = np.lexsort((by, bx))
+        keys, body = keys[order], body[order]
+        starts = np.flatnonzero(np.concatenate(([True], (keys[1:] != keys[:-1]).any(axis=1))))
+        return keys[starts], np.split(body, starts[1:])
+
+    def _block_pairs(self, key: np.ndarray, members: np.ndarray, mins: np.ndarray, maxs: np.ndarray,
+                     dynamic: np.ndarray) -> np.ndarray:
+        pairs = sweep_pairs(mins[members], maxs[members], members)
+        first, second = pairs[:, 0], pairs[:, 1]
+        corner = np.floor(np.maximum(mins[first], mins[second]) / self.block_size).astype(np.int64)
+        keep = (dynamic[first] | dynamic[second]) & (corner == key).all(axis=1)
+        return pairs[keep]
+
+    def find_pairs(self, bodies: Bodies) -> np.ndarray:
+        idx = np.flatnonzero(bodies.active)
+        mins, maxs, dynamic = bodies.mins[idx], bodies.maxs[idx], bodies.dynamic[idx]
+        keys, members = self._blocks(mins, maxs)
+        tasks = [(key, m) for key, m in zip(keys, members) if len(m) > 1]
+        if len(idx) < self.min_bodies or self.workers <= 1 or len(tasks) < 2:
+            results = [self._block_pairs(key, m, mins, maxs, dynamic) for key, m in tasks]
+        else:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='broadphase')
+            results = list(self.executor.map(lambda task: self._block_pairs(*task, mins, maxs, dynamic), tasks))
+        if not results: return np.zeros((0, 2), dtype=np.intp)
+        pairs = np.concatenate(results)
+        return _sorted_pairs(idx[pairs[:, 0]], idx[pairs[:, 1]])
+
+
 class CollisionSystem:
-    def __init__(self, cell_size: tuple[float] = (2, 2), elasticity: float = 0.8):
-        self.collision_grid = CollisionGrid(cell_size)
-        self.elasticity = elasticity         
+    def __init__(self, cell_size: tuple[float] = (2, 2), elasticity: float = 0.8,
+                 broadphase: Optional[Broadphase] = None):
+        self.broadphase = GridBroadphase(cell_size) if broadphase is None else broadphase
+        self.elasticity = elasticity
+
+    def remove_entity(self, entity: Entity):
+        """Forgets entity before it leaves the world"""
+        self.broadphase.remove(entity)
+
+    @property
+    def collision_grid(self) -> Optional[CollisionGrid]:
+        """Spatial grid of the broadphase if it uses one"""
+        return getattr(self.broadphase, 'grid', None)
 
     def resolve_collision(self, entity1: Entity, entity2: Entity):
         """Resolve collision between 2 entities"""
@@ -84,56 +422,115 @@ class CollisionSystem:
         if entity1.script is not None: entity1.script.on_collision(entity1, entity2)
         if entity2.script is not None: entity2.script.on_collision(entity2, entity1)
 
+    @staticmethod
+    def _overlaps(entity: Entity, e: Entity) -> bool:
+        """AABB test between 2 entities (touching counts as collision)"""
+        obj_x_min = entity.transform.pos[0]
+        obj_x_max = entity.collider.hitbox_x + entity.transform.pos[0]
+        obj_y_min = entity.transform.pos[1]
+        obj_y_max = entity.collider.hitbox_y + entity.transform.pos[1]
+
+        oth_obj_x_min = e.transform.pos[0]
+        oth_obj_x_max = e.collider.hitbox_x + e.transform.pos[0]
+        oth_obj_y_min = e.transform.pos[1]
+        oth_obj_y_max = e.collider.hitbox_y + e.transform.pos[1]
+
+        return (obj_x_max >= oth_obj_x_min and obj_x_min <= oth_obj_x_max and obj_y_max >= oth_obj_y_min and obj_y_min <= oth_obj_y_max)
+
     def check_collision(self, entity: Entity) -> list[Entity]:
-        """Check all collisions at entity"""
+        """Check all collisions at entity (requires a grid broadphase)"""
         if entity.collider is None or not entity.collider.has_collision: return []
 
         collided = []
         for e in self.collision_grid.get_nearby(entity):
             if not e.collider.has_collision: continue
-            
-            obj_x_min = entity.transform.pos[0]
-            obj_x_max = entity.collider.hitbox_x + entity.transform.pos[0]
-            obj_y_min = entity.transform.pos[1]
-            obj_y_max = entity.collider.hitbox_y + entity.transform.pos[1]
-
-            oth_obj_x_min = e.transform.pos[0]
-            oth_obj_x_max = e.collider.hitbox_x + e.transform.pos[0]
-            oth_obj_y_min = e.transform.pos[1]
-            oth_obj_y_max = e.collider.hitbox_y + e.transform.pos[1]
-        
-            if (obj_x_max >= oth_obj_x_min and obj_x_min <= oth_obj_x_max and obj_y_max >= oth_obj_y_min and obj_y_min <= oth_obj_y_max):
-                collided.append(e)
+            if self._overlaps(entity, e): collided.append(e)
         return collided
-    
-    def process_collision(self, entities: list[Entity]):
-        """Process all collisions in entities's list"""
-        processed_pairs = set()
-    
-        for e1 in entities:
-            if e1.collider is None: continue
-            for e2 in self.check_collision(e1):
-                if e2.collider is None: continue
-                pair_id = tuple(sorted([id(e1), id(e2)]))
-            
-                if pair_id not in processed_pairs:
-                    self.resolve_collision(e1, e2)
-                    processed_pairs.add(pair_id)
-                    if e1.script is not None: e1.script.on_collision(e1, e2)
-                    if e2.script is not None: e1.script.on_collision(e2, e1)
+
+    def narrowphase(self, bodies: Bodies, pairs: np.ndarray) -> Contacts:
+        """Computes contacts for all candidate pairs which actually overlap"""
+        first, second = pairs[:, 0], pairs[:, 1]
+        mins, maxs = bodies.mins, bodies.maxs
+        hit = ((maxs[first] >= mins[second]) & (mins[first] <= maxs[second])).all(axis=1)
+        hit &= bodies.dynamic[first] | bodies.dynamic[second]
+        hit &= bodies.active[first] & bodies.active[second]
+        pairs, first, second = pairs[hit], first[hit], second[hit]
+
+        overlap = np.minimum(maxs[first], maxs[second]) - np.maximum(mins[first], mins[second])
+        axis = (overlap[:, 0] >= overlap[:, 1]).astype(np.intp)
+        rows = np.arange(len(pairs))
+        normals = np.zeros((len(pairs), 2))
+        normals[rows, axis] = np.where(mins[first, axis] < mins[second, axis], 1.0, -1.0)
+        return Contacts(pairs, normals, overlap[rows, axis])
+
+    def resolve_contacts(self, bodies: Bodies, contacts: Contacts):
+        """Applies positional corrections and impulses of all contacts at once.
+
+        Bodies without Physics are static: they are neither moved nor pushed.
+        """
+        first, second = contacts.pairs[:, 0], contacts.pairs[:, 1]
+        inv_first, inv_second = bodies.inv_mass[first], bodies.inv_mass[second]
+
+        correction = contacts.normals * contacts.penetrations[:, None]
+        delta_pos = np.zeros(bodies.pos.shape)
+        np.add.at(delta_pos, first, -correction * (inv_first > 0)[:, None])
+        np.add.at(delta_pos, second, correction * (inv_second > 0)[:, None])
+
+        relative_velocity = bodies.velocity[first] - bodies.velocity[second]
+        velocity_norm = np.einsum('ij,ij->i', relative_velocity, contacts.normals)
+        impulse_scalar = np.where(velocity_norm < 0, 0, -(1 + self.elasticity) * velocity_norm)
+        impulse = (impulse_scalar / (inv_first + inv_second))[:, None] * contacts.normals
+        delta_velocity = np.zeros(bodies.velocity.shape)
+        np.add.at(delta_velocity, first, impulse * inv_first[:, None])
+        np.add.at(delta_velocity, second, -impulse * inv_second[:, None])
+
+        bodies.pos += delta_pos
+        bodies.velocity += delta_velocity
+        bodies.write_back(contacts.pairs.ravel())
+
+    def process_collision(self, world: World, notify: bool = True) -> Contacts:
+        """Process all collisions between bodies in world.
+
+        Contacts are resolved in one batch, then, if `notify` is set,
+        Script.on_collision is fired once per entity of every colliding pair.
+        """
+        bodies = Bodies(world)
+        contacts = self.narrowphase(bodies, self.broadphase.find_pairs(bodies))
+        contacts.entities = bodies.entities
+        if len(contacts) == 0: return contacts
+        self.resolve_contacts(bodies, contacts)
+        if notify: self.notify_scripts(contacts)
+        return contacts
+
+    @staticmethod
+    def notify_scripts(contacts: Contacts):
+        """Fires Script.on_collision of both entities of every contact"""
+        entities = contacts.entities
+        for i, j in contacts.pairs.tolist():
+            e1, e2 = entities[i], entities[j]
+            if e1.script is not None: e1.script.on_collision(e1, e2)
+            if e2.script is not None: e2.script.on_collision(e2, e1)
 
 class PhysicsSystem:
-    def update(self, entities: list[Entity], delta_time: float, collision_system: CollisionSystem):
-        """Update states of entities per delta time"""
-        for e in entities:
-            if e.transform is None or e.physics is None: continue
+    # Vertical speed is halved to compensate for 1:2 aspect ratio of console cells
+    ASPECT = np.array((1, 0.5), dtype=np.float32)
 
-            t = np.float32(delta_time)
-        
-            e.physics.velocity = e.physics.velocity + e.physics.acceleration * t 
-            vel_magnitude = np.linalg.norm(e.physics.velocity)
-            if vel_magnitude > e.physics.velocity_limit:
-                e.physics.velocity = (e.physics.velocity / vel_magnitude) * e.physics.velocity_limit
+    def integrate(self, velocity: np.ndarray, acceleration: np.ndarray, velocity_limit: np.ndarray,
+                  pos: np.ndarray, delta_time: float):
+        """Integrates a batch of bodies in place (arrays are per-body rows)"""
+        t = np.float32(delta_time)
+        velocity += acceleration * t
+        vel_magnitude = np.sqrt(np.einsum('ij,ij->i', velocity, velocity))
+        over = vel_magnitude > velocity_limit
+        if over.any():
+            velocity[over] *= (velocity_limit[over] / vel_magnitude[over])[:, None]
+        pos += velocity * (t * self.ASPECT)
 
-            e.transform.pos = e.transform.pos + e.physics.velocity * t * np.array((1, 0.5), dtype=np.float32)
-        collision_system.collision_grid.set_cells_table(entities)
+    def update(self, world: World, delta_time: float):
+        """Update states of all bodies in world per delta time"""
+        for a in world.archetypes_with(Transform, Physics):
+            if a.count == 0: continue
+            velocity = a.view('velocity')
+            self.integrate(velocity, a.view('acceleration'), a.view('velocity_limit'),
+                           a.view('pos'), delta_time)
+            world.mark_dirty(a.view('slot')[velocity.any(axis=1)])
@@ -0,0 +1,97 @@
+from components import *
+from world import COMPONENT_COLUMNS
+from snapshot import COMPONENT_TYPES
+from dataclasses import MISSING, fields
+from typing import Any, Callable, Iterable, Optional
+import numpy as np
+import json
+import os
+
+
+class Prefab:
+    """Template of an entity kind for `Game.spawn`.
+
+    Component defaults are flattened into column values once, so spawning
+    writes them straight into storage without building components. Scripts
+    hold per-entity callbacks and can't be shared, so a prefab refers to a
+    script factory registered with `Game.register_script` by name.
+
+    Prefabs can be defined in JSON (see `from_dict` and `load_prefabs`).
+
+    Attributes:
+        name: Name of the prefab.
+        signature: Component types and tags of spawned entities.
+        values: Default column values by component field name.
+        script: Name of the script factory, or None for no Script.
+        on_spawn: Optional callback taking the game and a list of entities,
+                  called once per spawned batch instead of Script.on_init
+                  of every entity.
+    """
+
+    def __init__(self, name: str, components: Iterable = (), tags: Iterable[str] = (),
+                 script: Optional[str] = None, on_spawn: Optional[Callable] = None):
+        self.name = name
+        self.script = script
+        self.on_spawn = on_spawn
+        self.values: dict[str, Any] = {}
+        types = set()
+        for component in components:
+            if isinstance(component, Script):
+                raise ValueError('Prefabs refer to scripts by name, pass script=<factory name>')
+            if type(component) not in COMPONENT_COLUMNS:
+                raise TypeError(f'Unknown component {component!r}')
+            types.add(type(component))
+            for field in fields(component):
+                value = getattr(component, field.name)
+                dtype, shape = COMPONENT_COLUMNS[type(component)][field.name]
+                self.values[field.name] = np.array(value, dtype=dtype) if shape else value
+        if script is not None:
+            types.add(Script)
+        self.signature = frozenset(types) | frozenset(tags)
+
+    def __repr__(self):
+        return f'Prefab({self.name!r})'
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict[str, Any]) -> 'Prefab':
+        """Creates a prefab from its JSON form.
+
+        Example:
+            {"components": {"Transform": {}, "Render": {"texture_id": "star"}},
+             "tags": ["star"], "script": "star"}
+
+        Fields missing from a component take the dataclass default, or zero
+        if it has none.
+        """
+        components = []
+        for type_name, field_values in data.get('components', {}).items():
+            component_type = COMPONENT_TYPES.get(type_name)
+            if component_type is None or component_type is Script:
+                raise ValueError(f'Prefab {name!r}: unknown component {type_name!r}')
+            columns = COMPONENT_COLUMNS[component_type]
+            unknown = field_values.keys() - columns.keys()
+            if unknown:
+                raise ValueError(f'Prefab {name!r}: unknown {type_name} fields {sorted(unknown)}')
+            kwargs = dict(field_values)
+            for field in fields(component_type):
+                if field.name not in kwargs and field.default is MISSING:
+                    dtype, shape = columns[field.name]
+                    kwargs[field.name] = np.zeros(shape, dtype=dtype) if shape else dtype(0)
+            components.append(component_type(**kwargs))
+        return cls(name, components, data.get('tags', ()), data.get('script'))
+
+
+def load_prefabs(filename: str = 'prefabs.json', search_path: Optional[Iterable[str]] = None) -> dict[str, Prefab]:
+    """Reads prefabs from a JSON file mapping names to prefab definitions.
+
+    Like textures.json, a relative filename is looked up in the working
+    directory and then in the engine directory.
+    """
+    if search_path is None:
+        search_path = [os.getcwd(), os.path.dirname(os.path.abspath(__file__))]
+    paths = [filename] if os.path.isabs(filename) else [os.path.join(d, filename) for d in search_path]
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, 'r') as f:
+                return {name: Prefab.from_dict(name, data) for name, data in json.load(f).items()}
+    raise FileNotFoundError(f'Prefab file {filename} not found')
@@ -0,0 +1,149 @@
+from typing import Optional
+import numpy as np
+import json
+import os
+import threading
+import time
+
+
+class _Section:
+    """Context manager timing one section"""
+    __slots__ = ('profiler', 'name', 'entity', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str, entity: int):
+        self.profiler = profiler
+        self.name = name
+        self.entity = entity
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns(), self.entity)
+        return False
+
+
+class _NullSection:
+    """Shared context manager used while profiling is disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    """Records durations of named sections into a ring buffer.
+
+    Sections are timed with `with profiler.section('physics'): ...`. While
+    disabled, `section` returns a shared no-op context manager, so
+    instrumented code costs a method call per section. Once the buffer is
+    full the oldest records are overwritten. Section names should come from
+    a small fixed set; per-entity sections pass the entity id separately,
+    it ends up in the args of the trace event.
+
+    Attributes:
+        enabled: Whether sections are recorded.
+        scripts: Whether script callbacks are timed per entity as well.
+        capacity: Number of records kept.
+        count: Number of records made since the last clear.
+    """
+
+    def __init__(self, capacity: int = 1 << 16, enabled: bool = False, scripts: bool = False):
+        self.enabled = enabled
+        self.scripts = scripts
+        self.capacity = capacity
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.threads: list[int] = []
+        self.name = np.zeros(capacity, dtype=np.int32)
+        self.thread = np.zeros(capacity, dtype=np.int32)
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.duration = np.zeros(capacity, dtype=np.int64)
+        self.entity = np.full(capacity, -1, dtype=np.int64)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def enable(self, scripts: Optional[bool] = None):
+        """Starts recording, optionally switching per entity script timing"""
+        self.enabled = True
+        if scripts is not None: self.scripts = scripts
+
+    def disable(self):
+        """Stops recording, recorded data is kept"""
+        self.enabled = False
+
+    def clear(self):
+        """Drops all records"""
+        with self.lock:
+            self.count = 0
+
+    def section(self, name: str, entity: int = -1):
+        """Returns a context manager timing the enclosed block under name, optionally for an entity id"""
+        if not self.enabled: return _NULL_SECTION
+        return _Section(self, name, entity)
+
+    def record(self, name: str, start: int, end: int, entity: int = -1):
+        """Adds a record of a section between two perf_counter_ns readings, -1 for no entity"""
+        with self.lock:
+            name_id = self.name_ids.get(name)
+            if name_id is None:
+                name_id = self.name_ids[name] = len(self.names)
+                self.names.append(name)
+            thread = threading.get_ident()
+            if thread not in self.threads: self.threads.append(thread)
+            i = self.count % self.capacity
+            self.name[i] = name_id
+            self.thread[i] = self.threads.index(thread)
+            self.start[i] = start
+            self.duration[i] = end - start
+            self.entity[i] = entity
+            self.count += 1
+
+    def records(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (name ids, thread ids, starts, durations, entity ids) of kept records, oldest first"""
+        with self.lock:
+            size = min(self.count, self.capacity)
+            order = (np.arange(size) + self.count - size) % self.capacity
+            return self.name[order], self.thread[order], self.start[order], self.duration[order], self.entity[order]
+
+    def stats(self, last: Optional[int] = None) -> dict[str, dict]:
+        """Returns rolling stats per section name over kept records.
+
+        Args:
+            last: Only use this many most recent records. Defaults to all kept.
+
+        Returns:
+            Dictionary mapping section names to calls, mean, p95 and max
+            durations in milliseconds.
+        """
+        names, _, _, durations, _ = self.records()
+        if last is not None:
+            names, durations = names[-last:], durations[-last:]
+        result = {}
+        for name_id in np.unique(names).tolist():
+            ms = durations[names == name_id] / 1e6
+            result[self.names[name_id]] = {
+                'calls': len(ms),
+                'mean_ms': float(ms.mean()),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'max_ms': float(ms.max()),
+            }
+        return result
+
+    def export_chrome_trace(self, filename: str):
+        """Writes kept records as a Chrome trace / Perfetto JSON file"""
+        names, threads, starts, durations, entities = self.records()
+        pid = os.getpid()
+        events = [{'name': self.names[n], 'ph': 'X', 'pid': pid, 'tid': t, 'ts': s / 1000, 'dur': d / 1000}
+                  for n, t, s, d in zip(names.tolist(), threads.tolist(), starts.tolist(), durations.tolist())]
+        for event, entity in zip(events, entities.tolist()):
+            if entity >= 0: event['args'] = {'entity': entity}
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
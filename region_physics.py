@@ -0,0 +1,457 @@
+from components import *
+from physic_system import CollisionSystem, Contacts, PhysicsSystem, sweep_pairs
+from world import World
+from multiprocessing import shared_memory
+from typing import Optional, Sequence
+import multiprocessing as mp
+import numpy as np
+import threading
+import traceback
+
+
+# Shared per-row arrays: name -> (dtype, shape of a row)
+SHARED_COLUMNS = {
+    'pos': (np.float32, (2,)),
+    'velocity': (np.float32, (2,)),
+    'acceleration': (np.float32, (2,)),
+    'velocity_limit': (np.float64, ()),
+    'inv_mass': (np.float64, ()),
+    'size': (np.float32, (2,)),
+    'dynamic': (np.bool_, ()),
+    'active': (np.bool_, ()),
+    'region': (np.int32, ()),     # Owner when the rows were laid out, workers track it from there
+}
+
+
+class SharedColumns:
+    """Row arrays of SHARED_COLUMNS and per-region halo lists in shared memory blocks.
+
+    Attributes:
+        capacity: Number of rows.
+        regions: Number of regions.
+        blocks: SharedMemory blocks by array name.
+        arrays: Numpy views of the blocks by array name. Besides the row
+                columns, 'halo' holds the rows every region publishes to the
+                others each tick and 'halo_count' their numbers.
+    """
+
+    def __init__(self, capacity: int, regions: int, names: Optional[dict[str, str]] = None):
+        self.capacity = capacity
+        self.regions = regions
+        shapes = {name: (dtype, (capacity,) + shape) for name, (dtype, shape) in SHARED_COLUMNS.items()}
+        shapes['halo'] = (np.int64, (regions, capacity))
+        shapes['halo_count'] = (np.int64, (regions,))
+        self.blocks = {}
+        self.arrays = {}
+        for name, (dtype, shape) in shapes.items():
+            size = max(int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize, 1)
+            if names is None:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=names[name])
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @property
+    def names(self) -> dict[str, str]:
+        return {name: block.name for name, block in self.blocks.items()}
+
+    def close(self, unlink: bool = False):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if unlink: block.unlink()
+        self.blocks = {}
+
+
+class WorkerBarrier:
+    """Barrier of worker processes built from a semaphore per ordered pair of parties.
+
+    multiprocessing.Barrier wakes its waiters one by one through a condition
+    variable, which costs several times more per wait; here every party
+    posts a token to each other one and takes one from each. Like
+    threading.Barrier, waits raise BrokenBarrierError after `abort` or on
+    timeout.
+    """
+
+    def __init__(self, parties: int, timeout: float, context=mp):
+        self.parties = parties
+        self.timeout = timeout
+        # tokens[i][j] is posted by party j for party i
+        self.tokens = [[context.Semaphore(0) for _ in range(parties)] for _ in range(parties)]
+        self.broken = context.RawValue('b', 0)
+
+    def wait(self, party: int):
+        """Blocks party until all parties are waiting"""
+        if self.broken.value: raise threading.BrokenBarrierError
+        for other in range(self.parties):
+            if other != party: self.tokens[other][party].release()
+        for other in range(self.parties):
+            if other != party and not self.tokens[party][other].acquire(timeout=self.timeout):
+                self.abort()
+            if self.broken.value: raise threading.BrokenBarrierError
+
+    def abort(self):
+        """Breaks the barrier, waking all waiting parties"""
+        self.broken.value = 1
+        for row in self.tokens:
+            for token in row: token.release()
+
+
+class _RegionBodies:
+    """Local copies of the rows a region collides, in the form CollisionSystem expects.
+
+    `write_back` only remembers the resolved bodies: rows are written once
+    every region has read the state it resolves against.
+    """
+
+    def __init__(self, rows: np.ndarray, arrays: dict[str, np.ndarray]):
+        self.mins = arrays['pos'][rows]
+        self.maxs = self.mins + arrays['size'][rows]
+        self.dynamic = arrays['dynamic'][rows]
+        self.active = arrays['active'][rows]
+        self.inv_mass = arrays['inv_mass'][rows]
+        self.initial_velocity = arrays['velocity'][rows]
+        self.pos = self.mins.copy()
+        self.velocity = self.initial_velocity.copy()
+        self.resolved = np.zeros(0, dtype=np.intp)
+
+    def write_back(self, indices: np.ndarray):
+        self.resolved = np.unique(indices)
+
+
+def region_of(bounds: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Returns indices of the regions containing x coordinates"""
+    return np.searchsorted(bounds, x, side='right')
+
+
+class _Region:
+    """State of one region kept by its worker process between ticks.
+
+    The region owns the rows whose left edge (min x) lies in its strip and
+    only ever indexes those and the halo rows published by other regions.
+    """
+
+    def __init__(self, region: int, bounds: np.ndarray, elasticity: float, barrier: WorkerBarrier):
+        self.region = region
+        self.bounds = bounds
+        self.lo = bounds[region - 1] if region > 0 else -np.inf
+        self.hi = bounds[region] if region < len(bounds) else np.inf
+        self.barrier = barrier
+        self.physics = PhysicsSystem()
+        self.collision = CollisionSystem(elasticity=elasticity)
+        self.columns = None
+        self.own = np.zeros(0, dtype=np.intp)
+
+    def attach(self, names: dict):
+        self.close()
+        self.columns = SharedColumns(names['capacity'], len(self.bounds) + 1, names['blocks'])
+
+    def close(self):
+        if self.columns is not None: self.columns.close()
+        self.columns = None
+
+    def step(self, n_rows: int, n_bodies: int, delta_time: float, rescan: bool) -> tuple:
+        """One tick: integrates own movers, then finds and resolves the contacts owned by the region.
+
+        Returns pairs, normals and penetrations of the contacts, then rows,
+        position and velocity changes of resolved bodies of other regions.
+        """
+        arrays = self.columns.arrays
+        region = self.region
+        pos, velocity, size = arrays['pos'], arrays['velocity'], arrays['size']
+        if rescan:
+            self.own = np.flatnonzero(arrays['region'][:n_rows] == region)
+        own = self.own
+
+        movers = own[arrays['dynamic'][own]]
+        if len(movers):
+            own_pos, own_velocity = pos[movers], velocity[movers]
+            self.physics.integrate(own_velocity, arrays['acceleration'][movers], arrays['velocity_limit'][movers],
+                                   own_pos, delta_time)
+            pos[movers], velocity[movers] = own_pos, own_velocity
+
+        # Halo: own rows which left the strip or reach out of it
+        x_min = pos[own, 0]
+        stay = region_of(self.bounds, x_min) == region
+        halo = own[~stay | (x_min < self.lo) | (x_min + size[own, 0] >= self.hi)]
+        arrays['halo'][region, :len(halo)] = halo
+        arrays['halo_count'][region] = len(halo)
+
+        # Halo exchange: after the barrier all movers are integrated and the
+        # halo rows of other regions reaching into the strip are read as ghosts
+        self.barrier.wait(region)
+
+        counts = arrays['halo_count'].tolist()
+        # Rows which just left the strip may still reach into it
+        others = [arrays['halo'][q, :count] for q, count in enumerate(counts) if q != region and count]
+        halo = np.concatenate(others + [own[~stay]])
+        x_min = pos[halo, 0]
+        # Rows follow their left edge into other regions
+        arrived = region_of(self.bounds, x_min) == region
+        ghosts = halo[~arrived & (x_min < self.hi) & (x_min + size[halo, 0] >= self.lo)]
+        self.own = own = np.concatenate((own[stay], halo[arrived]))
+
+        local = np.concatenate((own, ghosts))
+        is_own = np.arange(len(local)) < len(own)
+        keep = local < n_bodies
+        keep[keep] = arrays['active'][local[keep]]
+        # Sorted by row, so local pairs map to rows in the order of Bodies indices
+        order = np.argsort(local[keep], kind='stable')
+        local, is_own = local[keep][order], is_own[keep][order]
+
+        bodies = _RegionBodies(local, arrays)
+        pairs = sweep_pairs(bodies.mins, bodies.maxs, np.arange(len(local)))
+        contacts = self.collision.narrowphase(bodies, pairs)
+        # A pair belongs to the region holding the left edge of the overlap of its AABBs
+        left = np.maximum(bodies.mins[contacts.pairs[:, 0], 0], bodies.mins[contacts.pairs[:, 1], 0])
+        mine = region_of(self.bounds, left) == region
+        contacts = Contacts(contacts.pairs[mine], contacts.normals[mine], contacts.penetrations[mine])
+        if len(contacts):
+            self.collision.resolve_contacts(bodies, contacts)
+        resolved = bodies.resolved
+        foreign = resolved[~is_own[resolved]]
+        seam = (local[foreign], bodies.pos[foreign] - bodies.mins[foreign],
+                bodies.velocity[foreign] - bodies.initial_velocity[foreign])
+
+        # Every region has read the state it resolves against before rows are written
+        self.barrier.wait(region)
+
+        resolved = resolved[is_own[resolved]]
+        rows = local[resolved]
+        pos[rows] = bodies.pos[resolved]
+        velocity[rows] = bodies.velocity[resolved]
+        return (local[contacts.pairs], contacts.normals, contacts.penetrations) + seam
+
+
+def _worker(region: int, bounds: np.ndarray, elasticity: float, connection, barrier):
+    state = _Region(region, bounds, elasticity, barrier)
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == 'stop': return
+            _, names, n_rows, n_bodies, delta_time, rescan = message
+            if names is not None: state.attach(names)
+            try:
+                connection.send(('ok',) + state.step(n_rows, n_bodies, delta_time, rescan))
+            except Exception:
+                barrier.abort()
+                connection.send(('error', traceback.format_exc()))
+    finally:
+        state.close()
+
+
+class RegionPhysics:
+    """Physics integration and collision detection split over worker processes.
+
+    The world is cut into vertical strips at `bounds` (x coordinates), one
+    region per worker process. Body columns stay resident in shared memory
+    between ticks: a tick copies in only the rows which differ from the
+    world, i.e. were written by scripts since the last tick (all of them
+    once entities were added or removed), and copies integrated movers back
+    out.
+
+    Each worker keeps the rows it owns, those with their left edge in its
+    strip, integrates its movers and publishes the owned rows reaching out
+    of the strip as its halo. After a barrier it takes over rows which moved
+    into its strip and finds contacts among its rows and the halo rows of
+    other regions reaching in (ghosts). A contact is owned by the region
+    holding the left edge of the overlap, so each is found exactly once.
+    Workers resolve their contacts themselves once all of them read the
+    state to resolve against; only the changes to bodies of other regions
+    (contacts across a seam) are sent back and applied by the main process.
+    Contacts are reported in lexicographic pair order like PhysicsSystem
+    with CollisionSystem, with the same results up to rounding of bodies
+    pushed by contacts of several regions.
+
+    Workers are started on first use and stopped by `close`.
+
+    Attributes:
+        regions: Number of regions and worker processes.
+        bounds: Inner region boundaries, chosen from the first world's
+                positions when not given.
+        collision_system: System whose elasticity is used and which fires
+                          Script.on_collision.
+    """
+
+    def __init__(self, regions: int = 2, bounds: Optional[Sequence[float]] = None,
+                 collision_system: Optional[CollisionSystem] = None, timeout: float = 30.0):
+        self.regions = regions
+        self.bounds = None if bounds is None else np.asarray(bounds, dtype=np.float64)
+        if self.bounds is not None and len(self.bounds) != regions - 1:
+            raise ValueError(f'{regions} regions need {regions - 1} bounds, got {len(self.bounds)}')
+        self.collision_system = CollisionSystem() if collision_system is None else collision_system
+        self.timeout = timeout
+        self.columns = None
+        self.barrier = None
+        self.workers = []
+        self.connections = []
+        self._layout = None
+        self._segments = []
+        self._entities = []
+        self._slots = np.zeros(0, dtype=np.int64)
+        self._n_rows = 0
+        self._n_bodies = 0
+
+    def start(self, world: Optional[World] = None):
+        """Starts worker processes, choosing bounds from world positions if needed"""
+        if self.workers: return
+        if self.bounds is None:
+            xs = [a.view('pos')[:, 0] for a in world.archetypes_with(Transform)] if world is not None else []
+            xs = np.concatenate(xs) if xs else np.zeros(0)
+            quantiles = np.arange(1, self.regions) / self.regions
+            self.bounds = np.quantile(xs, quantiles) if len(xs) else quantiles * 100
+        context = mp.get_context('spawn')
+        # Kept referenced until workers stop, spawned children attach to it by name
+        self.barrier = barrier = WorkerBarrier(self.regions, self.timeout, context)
+        for region in range(self.regions):
+            connection, child = context.Pipe()
+            worker = context.Process(target=_worker,
+                                     args=(region, self.bounds, self.collision_system.elasticity, child, barrier),
+                                     name=f'physics-region-{region}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+            self.connections.append(connection)
+        # New workers have no rows yet
+        self._layout = None
+
+    def close(self):
+        """Stops workers and frees shared memory"""
+        for connection in self.connections:
+            try:
+                connection.send(('stop',))
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.join(self.timeout)
+        self.workers, self.connections, self.barrier = [], [], None
+        if self.columns is not None:
+            self.columns.close(unlink=True)
+            self.columns = None
+        self._layout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_rows(self, a, start: int, index):
+        """Copies rows of an archetype (index into its live rows) to shared rows from start"""
+        arrays = self.columns.arrays
+        rows = np.arange(start, start + a.count)[index]
+        arrays['pos'][rows] = a.view('pos')[index]
+        if Physics in a.signature:
+            arrays['velocity'][rows] = a.view('velocity')[index]
+            arrays['acceleration'][rows] = a.view('acceleration')[index]
+            arrays['velocity_limit'][rows] = a.view('velocity_limit')[index]
+            arrays['inv_mass'][rows] = 1 / a.view('mass')[index]
+        if Collider in a.signature:
+            arrays['size'][rows, 0] = a.view('hitbox_x')[index]
+            arrays['size'][rows, 1] = a.view('hitbox_y')[index]
+            arrays['active'][rows] = a.view('has_collision')[index]
+
+    def _dirty(self, a, start: int) -> np.ndarray:
+        """Indices of live rows of an archetype which differ from their shared copies"""
+        arrays = self.columns.arrays
+        rows = slice(start, start + a.count)
+        dirty = (a.view('pos') != arrays['pos'][rows]).any(axis=1)
+        if Physics in a.signature:
+            dirty |= (a.view('velocity') != arrays['velocity'][rows]).any(axis=1)
+            dirty |= (a.view('acceleration') != arrays['acceleration'][rows]).any(axis=1)
+            dirty |= a.view('velocity_limit') != arrays['velocity_limit'][rows]
+            dirty |= 1 / a.view('mass') != arrays['inv_mass'][rows]
+        if Collider in a.signature:
+            dirty |= a.view('hitbox_x') != arrays['size'][rows, 0]
+            dirty |= a.view('hitbox_y') != arrays['size'][rows, 1]
+            dirty |= a.view('has_collision') != arrays['active'][rows]
+        return np.flatnonzero(dirty)
+
+    def _sync(self, world: World) -> tuple[Optional[dict], bool]:
+        """Brings the shared rows up to date with the world.
+
+        Rows are colliders in Bodies order, then movers without Collider.
+        Returns new block names if the memory was reallocated, and whether
+        rows were laid out anew, so workers have to rescan the region column.
+        """
+        bodies = [a for a in world.archetypes_with(Transform, Collider) if a.count]
+        movers = [a for a in world.archetypes_with(Transform, Physics) if a.count and Collider not in a.signature]
+        segments = bodies + movers
+        layout = [(a, a.count, a.version) for a in segments]
+        names = None
+        if layout != self._layout:
+            n_rows = sum(a.count for a in segments)
+            if self.columns is None or self.columns.capacity < n_rows:
+                if self.columns is not None: self.columns.close(unlink=True)
+                self.columns = SharedColumns(max(1024, 2 * n_rows), self.regions)
+                names = {'capacity': self.columns.capacity, 'blocks': self.columns.names}
+            arrays = self.columns.arrays
+            for name in ('velocity', 'acceleration', 'velocity_limit', 'inv_mass', 'size', 'active'):
+                arrays[name][:n_rows] = 0
+            self._segments = []
+            start = 0
+            for a in segments:
+                self._write_rows(a, start, slice(None))
+                arrays['dynamic'][start:start + a.count] = Physics in a.signature
+                self._segments.append((a, start))
+                start += a.count
+            arrays['region'][:n_rows] = region_of(self.bounds, arrays['pos'][:n_rows, 0])
+            self._layout = layout
+            self._entities = [e for a in bodies for e in a.entities]
+            self._slots = np.concatenate([a.view('slot') for a in bodies]) if bodies else np.zeros(0, dtype=np.int64)
+            self._n_rows, self._n_bodies = n_rows, len(self._entities)
+            return names, True
+
+        # Rows written by scripts or systems since the last tick. Rows moved
+        # to another strip stay with their owner until its next halo exchange.
+        for a, start in self._segments:
+            dirty = self._dirty(a, start)
+            if len(dirty): self._write_rows(a, start, dirty)
+        return names, False
+
+    def _download(self, world: World):
+        """Writes integrated movers back to the world"""
+        arrays = self.columns.arrays
+        for a, start in self._segments:
+            if Physics in a.signature:
+                stop = start + a.count
+                velocity = arrays['velocity'][start:stop]
+                a.view('pos')[:] = arrays['pos'][start:stop]
+                a.view('velocity')[:] = velocity
+                world.mark_dirty(a.view('slot')[velocity.any(axis=1)])
+
+    def update(self, world: World, delta_time: float, notify: bool = True) -> Contacts:
+        """Integrates and collides all bodies of world for one tick.
+
+        Returns contacts like CollisionSystem.process_collision, firing
+        Script.on_collision if `notify` is set.
+        """
+        self.start(world)
+        names, rescan = self._sync(world)
+        for connection in self.connections:
+            connection.send(('step', names, self._n_rows, self._n_bodies, delta_time, rescan))
+
+        results, errors = [], []
+        for connection in self.connections:
+            status, *result = connection.recv()
+            if status == 'error': errors.append(result[0])
+            else: results.append(result)
+        if errors:
+            raise RuntimeError('Physics worker failed:\n' + errors[0])
+
+        arrays = self.columns.arrays
+        seam_rows = np.concatenate([r[3] for r in results])
+        np.add.at(arrays['pos'], seam_rows, np.concatenate([r[4] for r in results]).reshape(-1, 2))
+        np.add.at(arrays['velocity'], seam_rows, np.concatenate([r[5] for r in results]).reshape(-1, 2))
+        self._download(world)
+
+        pairs = np.concatenate([r[0] for r in results]).reshape(-1, 2)
+        order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+        contacts = Contacts(pairs[order],
+                            np.concatenate([r[1] for r in results]).reshape(-1, 2)[order],
+                            np.concatenate([r[2] for r in results])[order],
+                            self._entities)
+        if len(contacts) == 0: return contacts
+        world.mark_dirty(self._slots[np.unique(contacts.pairs)])
+        if notify: self.collision_system.notify_scripts(contacts)
+        return contacts
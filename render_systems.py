@@ -1,38 +1,219 @@
 from components import *
 from entity import Entity
-from typing import Optional
-import json
-from copy import copy
+from world import Query
+from physic_system import CollisionGrid
+from texture_atlas import SPACE, SYMBOL_DTYPE, Texture, TextureAtlas
+from profiler import Profiler
+from typing import Iterable, Optional
+import numpy as np
+import shutil
+import sys
+import threading
 
 
 HIGHLIGHTS = {'default': ('+', '-', '|'),  
               'empty': (' ', ' ', ' '), 
               'focused': ('#', '=', 'I')}
 
+def array_to_rows(screen: np.ndarray) -> list[str]:
+    """Converts a 2D array of code points to a list of strings"""
+    screen = np.ascontiguousarray(screen, dtype=SYMBOL_DTYPE)
+    return screen.view(f'<U{screen.shape[1]}').ravel().tolist()
+
+
+class Sprites:
+    """Renderable state gathered from entities for one frame.
+
+    Attributes:
+        entities: Entity handles by sprite index.
+        pos: Copy of positions.
+        priority: Draw priorities.
+        visible: Visibility flags.
+        texture_id: Texture ids (object array).
+        hitbox: Collider sizes, -1 for entities without Collider.
+        slots: World slots, -1 for entities outside a world.
+    """
+
+    def __init__(self, entities_list: Iterable[Entity]):
+        if isinstance(entities_list, Query):
+            self._gather_columns([a for a in entities_list.archetypes if a.count])
+        else:
+            self._gather_entities([e for e in entities_list if e.render is not None and e.transform is not None])
+
+    def _gather_columns(self, archetypes):
+        self.entities = []
+        for a in archetypes: self.entities.extend(a.entities)
+        def column(name, empty):
+            return np.concatenate([a.view(name) for a in archetypes]) if archetypes else empty
+        self.pos = column('pos', np.zeros((0, 2), dtype=np.float32))
+        self.priority = column('draw_priority', np.zeros(0, dtype=np.int32))
+        self.visible = column('is_visible', np.zeros(0, dtype=bool))
+        self.texture_id = column('texture_id', np.zeros(0, dtype=object))
+        self.slots = column('slot', np.zeros(0, dtype=np.int64))
+        self.hitbox = np.full((len(self.entities), 2), -1, dtype=np.int32)
+        start = 0
+        for a in archetypes:
+            if Collider in a.signature:
+                self.hitbox[start:start + a.count, 0] = a.view('hitbox_x')
+                self.hitbox[start:start + a.count, 1] = a.view('hitbox_y')
+            start += a.count
+
+    def _gather_entities(self, entities: list[Entity]):
+        self.entities = entities
+        self.pos = np.array([e.transform.pos for e in entities], dtype=np.float32).reshape(-1, 2)
+        self.priority = np.array([e.render.draw_priority for e in entities], dtype=np.int32)
+        self.visible = np.array([e.render.is_visible for e in entities], dtype=bool)
+        self.texture_id = np.empty(len(entities), dtype=object)
+        self.texture_id[:] = [e.render.texture_id for e in entities]
+        self.slots = np.array([e._slot for e in entities], dtype=np.int64)
+        self.hitbox = np.array([(-1, -1) if e.collider is None else (e.collider.hitbox_x, e.collider.hitbox_y)
+                                for e in entities], dtype=np.int32).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.entities)
+
+
+class RenderSnapshot:
+    """Immutable renderable state of one frame, safe to hand to another thread.
+
+    Holds read-only copies of sprite columns and the camera, but no entity
+    handles, so composing a frame never touches the world.
+
+    Attributes:
+        frame: Number of the frame the snapshot was taken at.
+        camera: Screen coordinates of the world origin.
+        pos, priority, visible, texture_id, hitbox, slots: As in Sprites.
+    """
+    __slots__ = ('frame', 'camera', 'pos', 'priority', 'visible', 'texture_id', 'hitbox', 'slots')
+
+    def __init__(self, sprites: Sprites, camera: tuple[int, int], frame: int = 0):
+        self.frame = frame
+        self.camera = camera
+        # Sprites gathers fresh arrays, they only need to be locked
+        for name in ('pos', 'priority', 'visible', 'texture_id', 'hitbox', 'slots'):
+            column = getattr(sprites, name)
+            column.flags.writeable = False
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.pos)
+
+
+class TerminalPresenter:
+    """Writes frames to a terminal, emitting only cells changed since the last frame.
+
+    Changed runs of every row are written after an ANSI cursor move, all in a
+    single write per frame. The first frame, a frame of different size or a
+    terminal resize cause a full redraw.
+    """
+    # Unchanged cells between two changed runs shorter than this are rewritten
+    # instead of emitting another cursor move
+    MERGE_GAP = 4
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.last_frame = None
+        self.terminal_size = None
+
+    def reset(self):
+        """Forces a full redraw on the next frame"""
+        self.last_frame = None
+
+    def _changed_runs(self, changed: np.ndarray):
+        x = np.flatnonzero(changed)
+        breaks = np.flatnonzero(np.diff(x) > self.MERGE_GAP + 1)
+        starts = np.concatenate(([x[0]], x[breaks + 1]))
+        ends = np.concatenate((x[breaks], [x[-1]])) + 1
+        return zip(starts.tolist(), ends.tolist())
+
+    def present(self, frame: np.ndarray):
+        """Displays a frame given as a 2D array of code points"""
+        terminal_size = shutil.get_terminal_size()
+        last = self.last_frame
+        rows = array_to_rows(frame)
+        if last is None or last.shape != frame.shape or terminal_size != self.terminal_size:
+            out = ['\x1b[H\x1b[2J', '\n'.join(rows)]
+        else:
+            out = []
+            changed = frame != last
+            for y in np.flatnonzero(changed.any(axis=1)).tolist():
+                row = rows[y]
+                for start, end in self._changed_runs(changed[y]):
+                    out.append(f'\x1b[{y + 1};{start + 1}H{row[start:end]}')
+            out.append(f'\x1b[{len(rows)};{len(rows[-1]) + 1}H')
+        stream = sys.stdout if self.stream is None else self.stream
+        stream.write(''.join(out))
+        stream.flush()
+        self.last_frame = frame.copy()
+        self.terminal_size = terminal_size
+
+
 class SceneRenderSystem:
     """Handles rendering of entities to a console-based screen with camera tracking.
     This system manages texture loading, entity rendering with draw priorities
+
+    Textures come from a TextureAtlas which is loaded on first use.
+    Sprite positions are kept in a spatial grid, parallel to the collision
+    grid, so only sprites near the camera rectangle are sorted and drawn.
+
+    The screen is a 2D numpy array of unicode code points; every sprite is
+    clipped against the viewport once and blitted with a slice assignment.
+
+    When rendering a Query, changes are taken from a World ChangeTracker: an
+    unchanged world with a still camera reuses the last screen in O(1), and
+    otherwise only screen tiles covered by changed sprites (before and after
+    the change) are redrawn. Camera moves and large changes redraw everything.
     """
+    # Share of changed sprites above which a full redraw is cheaper
+    FULL_REDRAW_SHARE = 0.25
     
-    def __init__(self, resolution: tuple[int]):
+    def __init__(self, resolution: tuple[int], atlas: Optional[TextureAtlas] = None,
+                 cell_size: tuple[int] = (16, 8), tile_size: tuple[int] = (16, 8)):
         self.target_entity = None
         self.resolution = resolution
-        self.symbol = '#'
-        self.last_entities_poses = {}
-        self.last_screen = []
-        self.entity_list_cache = {}
-        self.load_textures()
+        self.tile_size = tile_size
+        self.last_screen = None
+        self.last_camera = None
+        self.presenter = TerminalPresenter()
+        self.atlas = TextureAtlas() if atlas is None else atlas
+        self.spatial_index = CollisionGrid(cell_size)
+        self.world = None
+        self.tracker = None
+        self.max_sprite_size = np.ones(2, dtype=np.int64)
+        # Screen rectangle (top, bottom, left, right) each slot was last drawn at
+        self.drawn_rects = np.zeros((0, 4), dtype=np.int64)
+
+    def remove_entity(self, entity: Entity):
+        """Forgets entity before it leaves the world"""
+        self.spatial_index.remove(entity)
 
     def load_textures(self):
-        """Loads texture definitions from textures.json file"""
-        with open('textures.json', 'r+') as f:
-            self.textures = json.load(f)
+        """Reloads textures, the atlas is read again on first use"""
+        self.atlas.reload()
 
     def set_target(self, target: Entity):
         """Sets the target entity that the camera will follow"""
         self.target_entity = target
-    
-    def _render_entity(self, screen: list[list[str]], entity: Entity, 
+
+    def get_texture(self, texture_id: Optional[str], hitbox: tuple[int, int]) -> Optional[Texture]:
+        """Returns texture by id, or a box of hitbox size if it is missing"""
+        texture = None if texture_id is None else self.atlas.get(str(texture_id))
+        if texture is None and hitbox[0] >= 0:
+            texture = self.atlas.box(hitbox[0], hitbox[1])
+        return texture
+
+    def blit(self, screen: np.ndarray, texture: Texture, screen_x: int, screen_y: int):
+        """Draws texture with its bottom-left corner at (screen_x, screen_y), clipped to screen"""
+        height, width = texture.shape
+        top = screen_y - height + 1
+        y0, y1 = max(top, 0), min(top + height, screen.shape[0])
+        x0, x1 = max(screen_x, 0), min(screen_x + width, screen.shape[1])
+        if y0 >= y1 or x0 >= x1: return
+        ty, tx = y0 - top, x0 - screen_x
+        np.copyto(screen[y0:y1, x0:x1], texture.symbols[ty:ty + y1 - y0, tx:tx + x1 - x0],
+                  where=texture.mask[ty:ty + y1 - y0, tx:tx + x1 - x0])
+
+    def _render_entity(self, screen: np.ndarray, entity: Entity, 
                        target_x: int, target_y: int):
         """Renders a single entity onto the screen buffer"""
         collider = entity.collider
@@ -42,72 +223,308 @@ class SceneRenderSystem:
         if render is None or transform is None or not render.is_visible: 
             return
 
-        if self.textures.get(str(render.texture_id)) is None:
-            if collider is None: return
-            if render.texture_id is None: render.texture_id = str(entity.id)
-            self.textures[str(render.texture_id)] = [self.symbol * collider.hitbox_x for _ in range(collider.hitbox_y)]
-        texture = self.textures[str(render.texture_id)]
+        hitbox = (-1, -1) if collider is None else (collider.hitbox_x, collider.hitbox_y)
+        texture = self.get_texture(render.texture_id, hitbox)
+        if texture is None: return
+        self.blit(screen, texture, target_x + round(transform.pos[0]), target_y - round(transform.pos[1]))
 
-        screen_x = target_x + round(transform.pos[0])
-        screen_y = target_y - round(transform.pos[1])
+    def print_screen(self, entities_list: Iterable[Entity], frame_style: str = 'default'):
+        """Renders and prints the complete screen to the console"""
+        self.presenter.present(self.frame(self.render(entities_list), frame_style))
 
-        for y, row in enumerate(texture):
-            for x, _ in enumerate(row):
-                sym_x = screen_x + x
-                sym_y = screen_y - y
-                if 0 <= sym_x < self.resolution[0] and 0 <= sym_y < self.resolution[1]:
-                    screen[sym_y][sym_x] = texture[y][x]
+    def frame(self, screen: np.ndarray, frame_style: str = 'default') -> np.ndarray:
+        """Returns screen surrounded by a border"""
+        highlight = [ord(h) for h in HIGHLIGHTS.get(frame_style, HIGHLIGHTS['default'])]
+        frame = np.empty((screen.shape[0] + 2, screen.shape[1] + 2), dtype=SYMBOL_DTYPE)
+        frame[1:-1, 1:-1] = screen
+        frame[[0, -1], :] = highlight[1]
+        frame[:, [0, -1]] = highlight[2]
+        frame[[0, 0, -1, -1], [0, -1, 0, -1]] = highlight[0]
+        return frame
 
-    def print_screen(self, entities_list: list[Entity], frame_style: str = 'default'):
-        """Renders and prints the complete screen to the console"""
-        highlight = HIGHLIGHTS.get(frame_style, HIGHLIGHTS['default'])
-        screen = self.render(entities_list)
-
-        border = highlight[0] + highlight[1] * self.resolution[0] + highlight[0]
-        print(border)
-        for row in screen:
-            print(highlight[2] + ''.join(row) + highlight[2])
-        print(border)
-
-    def render(self, entities_list: list[Entity], screen: Optional[list[list[str]]] = None) -> list[list]:
-        """Renders all visible entities to a screen buffer. Returns 2D list representing the rendered screen with all entities drawn"""
-        if screen is None: 
-            screen = [[' ' for _ in range(self.resolution[0])] for _ in range(self.resolution[1])]
-        
-        entities_list = copy(entities_list)
-        for e in entities_list: 
-            if e.render is None or e.transform is None: 
-                entities_list.remove(e)
-
-        current_e_list_cache = {}
-        entities_poses = {}
-    
-        for e in entities_list:
-            e_hash = id(e)
-            current_e_list_cache[e_hash] = e.render.draw_priority
-            entities_poses[e_hash] = tuple(e.transform.pos.tolist())
-    
-        if self.last_entities_poses == entities_poses and self.entity_list_cache == current_e_list_cache:
+    def camera(self) -> tuple[int, int]:
+        """Returns screen coordinates of the world origin for the current target"""
+        if self.target_entity is None:
+            return 0, 0
+        target_pos = self.target_entity.transform.pos + np.array(
+            (0, 0) if self.target_entity.collider is None else 
+            (self.target_entity.collider.hitbox_x, self.target_entity.collider.hitbox_y)
+        ) // 2
+        return self.resolution[0] // 2 - round(target_pos[0]), self.resolution[1] // 2 + round(target_pos[1])
+
+    def _update_max_sprite_size(self, hitbox: np.ndarray):
+        atlas = self.atlas
+        if not atlas.loaded: atlas.load()
+        size = np.maximum(atlas.shapes[:, ::-1].max(axis=0, initial=1), hitbox.reshape(-1, 2).max(axis=0, initial=1))
+        self.max_sprite_size = np.maximum(self.max_sprite_size, size)
+
+    def _query_screen_rect(self, top: int, bottom: int, left: int, right: int,
+                           center_x: int, center_y: int) -> list[Entity]:
+        """Returns indexed entities which may overlap a screen rectangle"""
+        # Sprites extend right and up from their anchor, extend the rectangle by the largest sprite
+        width, height = self.max_sprite_size
+        mins = np.array((left - center_x - width + 1, center_y - bottom - height + 2))
+        maxs = np.array((right - 1 - center_x, center_y - top))
+        return self.spatial_index.query_rect(mins, maxs)
+
+    def _cull(self, sprites: Sprites, center_x: int, center_y: int) -> np.ndarray:
+        """Returns sorted indices of sprites which may overlap the viewport"""
+        in_world = sprites.slots >= 0
+        if not in_world.all():
+            return np.arange(len(sprites))
+
+        index = self.spatial_index
+        points = np.rint(sprites.pos)
+        index.update(sprites.entities, sprites.slots, points, points)
+
+        self._update_max_sprite_size(sprites.hitbox)
+        found = self._query_screen_rect(0, self.resolution[1], 0, self.resolution[0], center_x, center_y)
+        if not found: return np.zeros(0, dtype=np.intp)
+
+        candidates = np.full(len(found), -1, dtype=np.intp)
+        if len(sprites):
+            sprite_index = np.full(int(sprites.slots.max()) + 1, -1, dtype=np.intp)
+            sprite_index[sprites.slots] = np.arange(len(sprites))
+            slots = np.array([e._slot for e in found], dtype=np.intp)
+            indexed = (slots >= 0) & (slots < len(sprite_index))
+            candidates[indexed] = sprite_index[slots[indexed]]
+        # Entities which are no longer sprites (lost Render, left the query) leave the index
+        for k in np.flatnonzero(candidates >= 0).tolist():
+            if sprites.entities[candidates[k]] is not found[k]: candidates[k] = -1
+        for k in np.flatnonzero(candidates < 0).tolist():
+            index.remove(found[k])
+        return np.sort(candidates[candidates >= 0])
+
+    def _ensure_rects(self, size: int):
+        if size > len(self.drawn_rects):
+            rects = np.zeros((max(size, 2 * len(self.drawn_rects)), 4), dtype=np.int64)
+            rects[:len(self.drawn_rects)] = self.drawn_rects
+            self.drawn_rects = rects
+
+    def _draw(self, screen: np.ndarray, texture: Texture, screen_x: int, screen_y: int, slot: int):
+        """Blits texture and remembers where the sprite of slot was drawn"""
+        self.blit(screen, texture, screen_x, screen_y)
+        if slot >= 0:
+            height, width = texture.shape
+            self.drawn_rects[slot] = (screen_y - height + 1, screen_y + 1, screen_x, screen_x + width)
+
+    def render(self, entities_list: Iterable[Entity], screen: Optional[np.ndarray] = None) -> np.ndarray:
+        """Renders all visible entities to a screen buffer. Returns 2D array of code points with all entities drawn"""
+        camera = self.camera()
+        if screen is not None or not isinstance(entities_list, Query):
+            return self._render_full(Sprites(entities_list), camera, screen)
+
+        world = entities_list.world
+        if self.world is not world:
+            self.world, self.tracker = world, world.track()
+            self.last_screen = None
+        if self.last_screen is not None and camera == self.last_camera and not self.tracker.changed:
             return self.last_screen
+
+        changed = self.tracker.take()
+        if (self.last_screen is None or camera != self.last_camera
+                or len(changed) > self.FULL_REDRAW_SHARE * len(entities_list)):
+            self.last_screen = self._render_full(Sprites(entities_list), camera)
         else:
-            self.last_entities_poses = entities_poses.copy()
-            self.sorted_entities_list = sorted(entities_list, key=lambda e: e.render.draw_priority)
-            self.entity_list_cache = current_e_list_cache.copy()
+            self._render_changed(entities_list, changed, camera)
+        self.last_camera = camera
+        return self.last_screen
 
-        entities_list = self.sorted_entities_list
+    def _render_full(self, sprites: Sprites, camera: tuple[int, int], screen: Optional[np.ndarray] = None) -> np.ndarray:
+        if screen is None:
+            screen = np.full((self.resolution[1], self.resolution[0]), SPACE, dtype=SYMBOL_DTYPE)
+        if len(sprites): self._ensure_rects(int(sprites.slots.max()) + 1)
+        self.drawn_rects[:] = 0
 
-        if self.target_entity is None:
-            center_x, center_y = (0, 0)
-        else:
-            target_pos = self.target_entity.transform.pos + np.array(
-                (0, 0) if self.target_entity.collider is None else 
-                (self.target_entity.collider.hitbox_x, self.target_entity.collider.hitbox_y)
-            ) // 2
-            center_x = self.resolution[0] // 2 - round(target_pos[0])
-            center_y = self.resolution[1] // 2 + round(target_pos[1])
-
-        for e in entities_list:
-            self._render_entity(screen, e, center_x, center_y)
-
-        self.last_screen = screen
-        return screen
\ No newline at end of file
+        center_x, center_y = camera
+        screen_x = center_x + np.rint(sprites.pos[:, 0]).astype(np.int64)
+        screen_y = center_y - np.rint(sprites.pos[:, 1]).astype(np.int64)
+
+        candidates = self._cull(sprites, center_x, center_y)
+        candidates = candidates[sprites.visible[candidates]]
+        order = candidates[np.lexsort((sprites.slots[candidates], sprites.priority[candidates]))]
+        for k in order.tolist():
+            texture = self.get_texture(sprites.texture_id[k], sprites.hitbox[k])
+            if texture is not None:
+                self._draw(screen, texture, int(screen_x[k]), int(screen_y[k]), int(sprites.slots[k]))
+        return screen
+
+    def snapshot(self, entities_list: Iterable[Entity], frame: int = 0) -> RenderSnapshot:
+        """Captures renderable state of entities and the camera for compose"""
+        return RenderSnapshot(Sprites(entities_list), self.camera(), frame)
+
+    def compose(self, snapshot: RenderSnapshot) -> np.ndarray:
+        """Renders a snapshot to a new screen buffer without touching the world.
+
+        Sprites are culled against the viewport with array operations instead
+        of the spatial index, which belongs to the simulation thread.
+        """
+        screen = np.full((self.resolution[1], self.resolution[0]), SPACE, dtype=SYMBOL_DTYPE)
+        if not len(snapshot): return screen
+        self._update_max_sprite_size(snapshot.hitbox)
+        width, height = self.max_sprite_size
+
+        center_x, center_y = snapshot.camera
+        screen_x = center_x + np.rint(snapshot.pos[:, 0]).astype(np.int64)
+        screen_y = center_y - np.rint(snapshot.pos[:, 1]).astype(np.int64)
+        candidates = np.flatnonzero(snapshot.visible & (screen_x < screen.shape[1]) & (screen_x + width > 0)
+                                    & (screen_y >= 0) & (screen_y - height + 1 < screen.shape[0]))
+        order = candidates[np.lexsort((snapshot.slots[candidates], snapshot.priority[candidates]))]
+        for k in order.tolist():
+            texture = self.get_texture(snapshot.texture_id[k], snapshot.hitbox[k])
+            if texture is not None:
+                self.blit(screen, texture, int(screen_x[k]), int(screen_y[k]))
+        return screen
+
+    def _sprite(self, entity: Entity, camera: tuple[int, int]):
+        """Returns (priority, texture, screen_x, screen_y) for a visible sprite or None"""
+        render, transform = entity.render, entity.transform
+        if not render.is_visible: return None
+        collider = entity.collider
+        hitbox = (-1, -1) if collider is None else (collider.hitbox_x, collider.hitbox_y)
+        texture = self.get_texture(render.texture_id, hitbox)
+        if texture is None: return None
+        center_x, center_y = camera
+        return (render.draw_priority, texture,
+                center_x + round(transform.pos[0]), center_y - round(transform.pos[1]))
+
+    def _render_changed(self, query: Query, changed: np.ndarray, camera: tuple[int, int]):
+        """Redraws screen tiles covered by changed sprites"""
+        screen = self.last_screen
+        tile_w, tile_h = self.tile_size
+        tiles = np.zeros((-(-screen.shape[0] // tile_h), -(-screen.shape[1] // tile_w)), dtype=bool)
+
+        def mark(top, bottom, left, right):
+            top, bottom = max(top, 0), min(bottom, screen.shape[0])
+            left, right = max(left, 0), min(right, screen.shape[1])
+            if top < bottom and left < right:
+                tiles[top // tile_h:(bottom - 1) // tile_h + 1, left // tile_w:(right - 1) // tile_w + 1] = True
+
+        self._ensure_rects(int(changed.max()) + 1)
+        slot_entities = self.world.slot_entities
+        for slot in changed.tolist():
+            rect = self.drawn_rects[slot].tolist()
+            if rect[0] != rect[1]: mark(*rect)
+            self.drawn_rects[slot] = 0
+
+            entity = slot_entities[slot] if slot < len(slot_entities) else None
+            if entity is None: continue
+            if not entity._archetype.signature.issuperset(query.terms):
+                self.spatial_index.remove(entity)
+                continue
+            point = np.rint(entity.transform.pos)[None]
+            self.spatial_index.update([entity], np.array([slot]), point, point)
+            sprite = self._sprite(entity, camera)
+            if sprite is None: continue
+            _, texture, screen_x, screen_y = sprite
+            height, width = texture.shape
+            self.max_sprite_size = np.maximum(self.max_sprite_size, (width, height))
+            mark(screen_y - height + 1, screen_y + 1, screen_x, screen_x + width)
+
+        center_x, center_y = camera
+        for ty, tx in np.argwhere(tiles).tolist():
+            top, left = ty * tile_h, tx * tile_w
+            bottom, right = min(top + tile_h, screen.shape[0]), min(left + tile_w, screen.shape[1])
+            tile = screen[top:bottom, left:right]
+            tile.fill(SPACE)
+
+            sprites = []
+            for entity in self._query_screen_rect(top, bottom, left, right, center_x, center_y):
+                if entity.world is not self.world or not entity._archetype.signature.issuperset(query.terms):
+                    continue
+                sprite = self._sprite(entity, camera)
+                if sprite is not None: sprites.append((sprite[0], entity._slot, sprite))
+            sprites.sort(key=lambda s: s[:2])
+            for _, slot, (_, texture, screen_x, screen_y) in sprites:
+                self.blit(tile, texture, screen_x - left, screen_y - top)
+                height, width = texture.shape
+                self.drawn_rects[slot] = (screen_y - height + 1, screen_y + 1, screen_x, screen_x + width)
+
+
+class RenderPipeline:
+    """Composes and presents frames on a separate thread.
+
+    The simulation publishes a RenderSnapshot after each frame's ticks and
+    continues without waiting for the terminal. The pipeline double buffers
+    snapshots: one is being composed and presented while the latest
+    published one waits in the back slot. A snapshot published before the
+    previous one was picked up replaces it, so a slow terminal drops frames
+    instead of slowing the simulation.
+
+    An exception raised on the render thread stops it and is re-raised by the
+    next publish or stop call.
+
+    Attributes:
+        render_system: System used to compose snapshots.
+        frame_style: Border style passed to SceneRenderSystem.frame.
+        profiler: Profiler timing compose and present on the render thread.
+        published: Number of snapshots published.
+        presented: Number of frames presented.
+        dropped: Number of snapshots replaced before being presented.
+    """
+
+    def __init__(self, render_system: SceneRenderSystem, frame_style: str = 'default',
+                 profiler: Optional[Profiler] = None):
+        self.render_system = render_system
+        self.frame_style = frame_style
+        self.profiler = Profiler() if profiler is None else profiler
+        self.published = 0
+        self.presented = 0
+        self.dropped = 0
+        self.error = None
+        self._back = None
+        self._running = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Starts the render thread"""
+        if self._thread is not None: return
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='render', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Presents the last published snapshot and stops the render thread"""
+        if self._thread is None: return
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout)
+        self._thread = None
+        self._raise_error()
+
+    def publish(self, snapshot: RenderSnapshot):
+        """Hands the latest snapshot to the render thread"""
+        self._raise_error()
+        with self._condition:
+            if self._back is not None: self.dropped += 1
+            self._back = snapshot
+            self.published += 1
+            self._condition.notify()
+
+    def _raise_error(self):
+        error, self.error = self.error, None
+        if error is not None: raise error
+
+    def _run(self):
+        render_system = self.render_system
+        try:
+            while True:
+                with self._condition:
+                    while self._back is None and self._running:
+                        self._condition.wait()
+                    snapshot, self._back = self._back, None
+                if snapshot is None: return
+                with self.profiler.section('compose'):
+                    screen = render_system.compose(snapshot)
+                with self.profiler.section('present'):
+                    render_system.presenter.present(render_system.frame(screen, self.frame_style))
+                self.presented += 1
+        except Exception as e:
+            self.error = e
@@ -0,0 +1,209 @@
+from typing import Iterator, Optional
+import numpy as np
+import random
+import struct
+
+
+MAGIC = b'UGEREC01'
+
+# Record layouts, each record starts with its tag byte
+SEED = struct.Struct('<cQ')             # b'S', seed
+FRAME = struct.Struct('<cHB')           # b'F', ticks, number of transitions
+TRANSITION = struct.Struct('<?B')       # pressed, key length, then the key in utf-8
+IDLE = struct.Struct('<cIH')            # b'R', frames, ticks of each frame
+
+MAX_KEY = 255
+
+
+def seed_rngs(seed: int):
+    """Seeds the random module and numpy's global generator"""
+    random.seed(seed)
+    np.random.seed(seed % (1 << 32))
+
+
+class InputRecorder:
+    """Append-only binary log of a session for exact replay.
+
+    Creating a recorder seeds the random module and numpy's global
+    generator and logs the seed, so the game should be built after it.
+    Once attached, the game logs every frame: the number of fixed ticks it
+    ran and the key transitions applied at its start. Runs of frames
+    without transitions and with the same number of ticks are stored as a
+    single record, so an idle frame costs nothing and others a few bytes.
+
+    Attributes:
+        filename: Path of the log.
+        seed: Last seed the generators were seeded with.
+        frames: Number of frames recorded.
+        ticks: Number of ticks recorded.
+    """
+
+    def __init__(self, filename: str, seed: Optional[int] = None):
+        self.filename = filename
+        self.file = open(filename, 'wb')
+        self.file.write(MAGIC)
+        self.frames = 0
+        self.ticks = 0
+        self.seed = None
+        self._idle_frames = 0
+        self._idle_ticks = 0
+        self.reseed(seed)
+
+    def attach(self, game):
+        """Starts recording the frames of a game"""
+        game.recorder = self
+        return self
+
+    def reseed(self, seed: Optional[int] = None) -> int:
+        """Seeds the generators with seed (a random one if None) and logs it"""
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self._flush_idle()
+        self.file.write(SEED.pack(b'S', seed))
+        self.seed = seed
+        seed_rngs(seed)
+        return seed
+
+    def record_frame(self, n_ticks: int, transitions: list[tuple[str, bool]]):
+        """Logs a frame, called by the game at the end of every frame"""
+        self.frames += 1
+        self.ticks += n_ticks
+        if not transitions:
+            if self._idle_frames and self._idle_ticks != n_ticks:
+                self._flush_idle()
+            self._idle_frames += 1
+            self._idle_ticks = n_ticks
+            return
+        self._flush_idle()
+        record = [FRAME.pack(b'F', n_ticks, len(transitions))]
+        for key, pressed in transitions:
+            encoded = key.encode()
+            if len(encoded) > MAX_KEY:
+                raise ValueError(f'Key name too long to record: {key!r}')
+            record.append(TRANSITION.pack(pressed, len(encoded)))
+            record.append(encoded)
+        self.file.write(b''.join(record))
+
+    def _flush_idle(self):
+        if self._idle_frames:
+            self.file.write(IDLE.pack(b'R', self._idle_frames, self._idle_ticks))
+            self._idle_frames = 0
+
+    def flush(self):
+        """Writes buffered records to the file"""
+        self._flush_idle()
+        self.file.flush()
+
+    def close(self):
+        """Writes buffered records and closes the log"""
+        if self.file.closed: return
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replay:
+    """Feeds a recorded session back through the game, as fast as possible.
+
+    The game has to be built the same way as the recorded one after
+    `seed` (called on construction) has reseeded the generators; headless
+    games work, as key transitions are pushed into the input directly.
+    Every recorded frame runs through `Game.step_frame` with its recorded
+    number of ticks, without pacing or rendering, so the world ends up in
+    the same state as in the session.
+
+    Attributes:
+        records: Parsed log: ('seed', seed) and ('frame', ticks, transitions, repeat).
+        frames: Number of frames in the log.
+        ticks: Number of ticks in the log.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{filename} is not an input recording')
+        self.records = self._parse(data, len(MAGIC))
+        self.frames = sum(r[3] for r in self.records if r[0] == 'frame')
+        self.ticks = sum(r[1] * r[3] for r in self.records if r[0] == 'frame')
+        self._position = 0
+        self._repeated = 0
+        self.seed()
+
+    @staticmethod
+    def _parse(data: bytes, offset: int) -> list[tuple]:
+        records = []
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            if tag == b'S':
+                _, seed = SEED.unpack_from(data, offset)
+                offset += SEED.size
+                records.append(('seed', seed))
+            elif tag == b'R':
+                _, frames, ticks = IDLE.unpack_from(data, offset)
+                offset += IDLE.size
+                records.append(('frame', ticks, (), frames))
+            elif tag == b'F':
+                _, ticks, count = FRAME.unpack_from(data, offset)
+                offset += FRAME.size
+                transitions = []
+                for _ in range(count):
+                    pressed, length = TRANSITION.unpack_from(data, offset)
+                    offset += TRANSITION.size
+                    transitions.append((data[offset:offset + length].decode(), pressed))
+                    offset += length
+                records.append(('frame', ticks, tuple(transitions), 1))
+            else:
+                raise ValueError(f'Corrupt input recording at byte {offset}')
+        return records
+
+    def seed(self):
+        """Applies the seeds logged before the first frame"""
+        while self._position < len(self.records) and self.records[self._position][0] == 'seed':
+            seed_rngs(self.records[self._position][1])
+            self._position += 1
+
+    def iter_frames(self) -> Iterator[tuple[int, tuple]]:
+        """Yields (ticks, transitions) of remaining frames, applying later seeds on the way"""
+        records = self.records
+        while self._position < len(records):
+            record = records[self._position]
+            if record[0] == 'seed':
+                seed_rngs(record[1])
+                self._position += 1
+                continue
+            _, n_ticks, transitions, repeat = record
+            self._repeated += 1
+            if self._repeated >= repeat:
+                self._position += 1
+                self._repeated = 0
+            yield n_ticks, transitions
+
+    def run(self, game, max_frames: Optional[int] = None) -> int:
+        """Replays remaining frames into a game.
+
+        Args:
+            game: Game built like the recorded one.
+            max_frames: Stop after this many frames. Defaults to all.
+
+        Returns:
+            Number of ticks replayed.
+        """
+        ticks = 0
+        game.is_running = True
+        try:
+            for frame, (n_ticks, transitions) in enumerate(self.iter_frames()):
+                for key, pressed in transitions:
+                    if pressed: game.input.press(key)
+                    else: game.input.release(key)
+                game.step_frame(n_ticks)
+                ticks += n_ticks
+                if max_frames is not None and frame + 1 >= max_frames: break
+        finally:
+            game.is_running = False
+        return ticks
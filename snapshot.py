@@ -0,0 +1,188 @@
+from components import *
+from entity import Entity
+from world import COMPONENT_COLUMNS
+from typing import Any
+import numpy as np
+import json
+
+
+COMPONENT_TYPES = {t.__name__: t for t in COMPONENT_COLUMNS}
+
+# Columns stored as indices into the snapshot's string table
+STRING_COLUMNS = ('texture_id', 'script')
+
+MAGIC = b'UGESNAP1'
+ALIGNMENT = 64
+
+
+class Snapshot:
+    """Columnar copy of all entities of a game.
+
+    Every archetype is stored as a block of columns: entity ids, component
+    fields as numpy arrays and texture ids and script names as indices into
+    a shared string table. Scripts themselves can't be stored, a restored
+    entity gets its script from the factory registered under the script's
+    name with `Game.register_script`; unnamed scripts are restored as empty
+    Script components.
+
+    On disk the snapshot is a JSON header followed by raw, aligned column
+    data, which `load` maps into memory instead of parsing.
+
+    Attributes:
+        archetypes: Per archetype: components (type names), tags, count and
+                    columns (name -> array).
+        strings: String table of texture ids and script names.
+        state: Game counters (tick, frame_count, player id).
+    """
+
+    def __init__(self, archetypes: list[dict], strings: list[str], state: dict[str, Any]):
+        self.archetypes = archetypes
+        self.strings = strings
+        self.state = state
+
+    def __len__(self):
+        return sum(a['count'] for a in self.archetypes)
+
+    @classmethod
+    def capture(cls, game) -> 'Snapshot':
+        """Copies all entities of a game (at a sync point, queued changes are not included)"""
+        strings, index = [], {}
+        def encode(values) -> np.ndarray:
+            codes = np.full(len(values), -1, dtype=np.int32)
+            for i, value in enumerate(values):
+                if isinstance(value, Script): value = value.name
+                if value is None: continue
+                value = str(value)
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(strings)
+                    strings.append(value)
+                codes[i] = code
+            return codes
+
+        archetypes = []
+        for a in game.world.archetypes.values():
+            if a.count == 0: continue
+            columns = {'id': np.array([e.id for e in a.entities], dtype=np.int64)}
+            for name in a.layout:
+                if name == 'slot': continue
+                view = a.view(name)
+                columns[name] = encode(view) if name in STRING_COLUMNS else view.copy()
+            archetypes.append({
+                'components': sorted(t.__name__ for t in a.signature if not isinstance(t, str)),
+                'tags': sorted(t for t in a.signature if isinstance(t, str)),
+                'count': a.count,
+                'columns': columns,
+            })
+        player = getattr(game, 'player', None)
+        state = {'tick': game.tick, 'frame_count': game.frame_count,
+                 'player': None if player is None else player.id}
+        return cls(archetypes, strings, state)
+
+    def save(self, filename: str):
+        """Writes the snapshot to a file"""
+        header = {'strings': self.strings, 'state': self.state, 'archetypes': []}
+        blobs, offset = [], 0
+        for a in self.archetypes:
+            columns = {}
+            for name, column in a['columns'].items():
+                column = np.ascontiguousarray(column)
+                columns[name] = {'dtype': column.dtype.str, 'shape': column.shape[1:], 'offset': offset}
+                blobs.append((offset, column))
+                offset += -(-column.nbytes // ALIGNMENT) * ALIGNMENT
+            header['archetypes'].append({k: a[k] for k in ('components', 'tags', 'count')} | {'columns': columns})
+
+        encoded = json.dumps(header).encode()
+        data_start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+        with open(filename, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.uint64(data_start).tobytes())
+            f.write(encoded)
+            for blob_offset, column in blobs:
+                f.seek(data_start + blob_offset)
+                f.write(column.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, filename: str, mmap: bool = True) -> 'Snapshot':
+        """Reads a snapshot, its columns are memory mapped unless `mmap` is False"""
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{filename} is not a snapshot')
+            data_start = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(data_start - len(MAGIC) - 8).rstrip(b'\0'))
+            data = None if mmap else f.read()
+
+        archetypes = []
+        for a in header['archetypes']:
+            columns = {}
+            for name, c in a['columns'].items():
+                shape = (a['count'],) + tuple(c['shape'])
+                if mmap:
+                    columns[name] = np.memmap(filename, dtype=c['dtype'], mode='r', shape=shape,
+                                              offset=data_start + c['offset']) if a['count'] else \
+                        np.zeros(shape, dtype=c['dtype'])
+                else:
+                    count = int(np.prod(shape, dtype=np.int64))
+                    columns[name] = np.frombuffer(data, dtype=c['dtype'], count=count,
+                                                  offset=c['offset']).reshape(shape)
+            archetypes.append({k: a[k] for k in ('components', 'tags', 'count')} | {'columns': columns})
+        return cls(archetypes, header['strings'], header['state'])
+
+    def restore(self, game):
+        """Adds all entities of the snapshot to an empty game in bulk.
+
+        Scripts are created by the game's registered factories; their
+        on_init callbacks are not called, as the state is restored as is.
+        Restored ids are claimed in the game's id allocator, so new ids
+        don't have to skip them one by one.
+        """
+        if game.entities or len(game.world):
+            raise ValueError('Snapshots can only be restored into an empty game')
+        strings = np.array(self.strings + [None], dtype=object)
+        if self.archetypes:
+            game.ids.claim(np.concatenate([a['columns']['id'] for a in self.archetypes]))
+        for a in self.archetypes:
+            columns = a['columns']
+            entities = [Entity(id) for id in columns['id'].tolist()]
+            values = {name: column for name, column in columns.items() if name not in STRING_COLUMNS and name != 'id'}
+            if 'texture_id' in columns:
+                values['texture_id'] = strings[columns['texture_id']]
+            signature = {COMPONENT_TYPES[name] for name in a['components']} | set(a['tags'])
+            game.world.add_many(entities, signature, values)
+            if 'script' in columns:
+                self._attach_scripts(game, entities, strings[columns['script']])
+            for entity in entities:
+                game.entities[entity.id] = entity
+
+        game.tick = self.state['tick']
+        game.frame_count = self.state['frame_count']
+        player = self.state.get('player')
+        if player is not None and player in game.entities:
+            game.set_player(game.entities[player])
+
+    @staticmethod
+    def _attach_scripts(game, entities: list[Entity], names: np.ndarray):
+        archetype = entities[0]._archetype
+        start = entities[0]._row
+        factories = game.script_factories
+        for row, (entity, name) in enumerate(zip(entities, names.tolist()), start):
+            factory = factories.get(name)
+            archetype.columns['script'][row] = Script(name=name) if factory is None else factory(game, entity)
+
+
+def fork(game, **kwargs):
+    """Returns an independent headless copy of a game for what-if simulation.
+
+    The copy has the same settings, prefabs and script factories, but no
+    game callbacks (on_tick, on_frame). Its scripts are created by the
+    factories for the copy, so scripts acting on the game they are given
+    leave the original alone. Extra keyword arguments are passed to the
+    Game constructor.
+    """
+    kwargs = {'elasticity': game.elasticity, 'headless': True} | kwargs
+    copy = type(game)(game.resolution, game.fps, game.tickspeed, **kwargs)
+    copy.script_factories.update(game.script_factories)
+    copy.prefabs.update(game.prefabs)
+    Snapshot.capture(game).restore(copy)
+    return copy
@@ -0,0 +1,99 @@
+from event_system import Event, EventBus, Phase
+
+
+class Ping(Event):
+    def __init__(self, name, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+
+class LoudPing(Ping):
+    pass
+
+
+def collect(bus, log, event_type=Ping, id=0, priority=0, tag=None):
+    return bus.subscribe(id, Phase.REACTION, event_type,
+                         lambda e: log.append(e.name if tag is None else (tag, e.name)), priority)
+
+
+def test_events_dispatch_by_priority_then_timestamp():
+    bus, log = EventBus(), []
+    collect(bus, log)
+    for name, priority, timestamp in (('late', 0, 3.0), ('urgent', 5, 4.0), ('early', 0, 1.0), ('mid', 0, 2.0)):
+        bus.emit(Phase.REACTION, Ping(name, priority=priority, timestamp=timestamp))
+    bus.dispatch(Phase.REACTION)
+    assert log == ['urgent', 'early', 'mid', 'late']
+
+
+def test_handlers_called_by_priority_then_subscription_order():
+    bus, log = EventBus(), []
+    collect(bus, log, tag='first')
+    collect(bus, log, tag='high', priority=1)
+    collect(bus, log, tag='second')
+    bus.emit(Phase.REACTION, Ping('a'))
+    bus.dispatch(Phase.REACTION)
+    assert log == [('high', 'a'), ('first', 'a'), ('second', 'a')]
+
+
+def test_subclass_events_reach_base_subscribers():
+    bus, log = EventBus(), []
+    collect(bus, log, Event, tag='event')
+    collect(bus, log, Ping, tag='ping')
+    collect(bus, log, LoudPing, tag='loud')
+    bus.emit(Phase.REACTION, Ping('plain', timestamp=1.0))
+    bus.emit(Phase.REACTION, LoudPing('loud', timestamp=2.0))
+    bus.dispatch(Phase.REACTION)
+    assert sorted(log[:2]) == [('event', 'plain'), ('ping', 'plain')]
+    assert sorted(log[2:]) == [('event', 'loud'), ('loud', 'loud'), ('ping', 'loud')]
+
+
+def test_changes_during_dispatch_wait_for_next_dispatch():
+    bus, log = EventBus(), []
+
+    def handler(event):
+        log.append(event.name)
+        if event.name == 'first':
+            bus.emit(Phase.REACTION, Ping('echo'))
+            collect(bus, log, tag='late', id=1)
+
+    bus.subscribe(0, Phase.REACTION, Ping, handler)
+    bus.emit(Phase.REACTION, Ping('first', timestamp=1.0))
+    bus.emit(Phase.REACTION, Ping('second', timestamp=2.0))
+    bus.dispatch(Phase.REACTION)
+    assert log == ['first', 'second']
+
+    bus.dispatch(Phase.REACTION)
+    assert log[2:] == ['echo', ('late', 'echo')]
+
+
+def test_unsubscribe_inside_handler():
+    bus, log = EventBus(), []
+
+    def handler(event):
+        log.append(('quitter', event.name))
+        bus.unsubscribe(Phase.REACTION, 1)
+
+    collect(bus, log, tag='stays', id=0)
+    bus.subscribe(1, Phase.REACTION, Ping, handler, priority=1)
+    collect(bus, log, tag='dropped', id=1)
+    bus.emit(Phase.REACTION, Ping('a', timestamp=1.0))
+    bus.emit(Phase.REACTION, Ping('b', timestamp=2.0))
+    bus.dispatch(Phase.REACTION)
+    assert log == [('quitter', 'a'), ('stays', 'a'), ('stays', 'b')]
+
+
+def test_compaction_drops_dead_subscriptions():
+    bus, log = EventBus(), []
+    table = bus.phases[Phase.REACTION]
+    count = EventBus.COMPACT_THRESHOLD + 2
+    for id in range(count):
+        collect(bus, log, tag=id, id=id)
+    for id in range(count - 1):
+        bus.unsubscribe(Phase.REACTION, id)
+    assert table.dead == 0
+    assert len(table.by_type[Ping]) == 1
+    assert table.live == 1
+
+    bus.emit(Phase.REACTION, Ping('a'))
+    bus.dispatch(Phase.REACTION)
+    assert log == [(count - 1, 'a')]
@@ -0,0 +1,18 @@
+from game import Game
+
+
+def test_changing_fps_paces_at_new_rate():
+    game = Game((80, 40), 30, 60, headless=True)
+    now = [0.0]
+    game.pacer.clock = lambda: now[0]
+    game.pacer.sleep = lambda seconds: now.__setitem__(0, now[0] + seconds)
+    game.pacer.spin_threshold = 0.0
+    game.pacer.start()
+    game.pacer.wait()
+    assert now[0] == 1 / 30
+
+    game.fps = 120
+    game.pacer.wait()
+    game.pacer.wait()
+    assert game.pacer.fps == 120
+    assert abs(now[0] - (1 / 30 + 1 / 120 + 1 / 120)) < 1e-9
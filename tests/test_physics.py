@@ -0,0 +1,113 @@
+import numpy as np
+
+from components import Collider, Physics, Render, Transform
+from entity import Entity
+from game import Game
+from physic_system import Bodies, GridBroadphase, ParallelSweepBroadphase, SortAndSweepBroadphase
+from world import World
+
+
+def body(game, pos, velocity=(0.0, 0.0)):
+    entity = Entity(game.new_id())
+    entity.add_component(Transform(pos=np.array(pos, dtype=np.float32)))
+    entity.add_component(Physics(mass=1.0, velocity=np.array(velocity, dtype=np.float32),
+                                 acceleration=np.zeros(2, dtype=np.float32), velocity_limit=10.0))
+    entity.add_component(Collider(hitbox_x=2, hitbox_y=2))
+    entity.add_component(Render())
+    game.add_entity(entity)
+    return entity
+
+
+def test_grid_evicts_entity_losing_collider():
+    game = Game((80, 40), 30, 60, headless=True)
+    mover = body(game, (10.0, 10.0), (1.0, 0.0))
+    other = body(game, (11.0, 10.0))
+    game.step(1)
+    grid = game.collision_system.collision_grid
+    assert other in grid.entities_table
+
+    other.remove_component(Collider)
+    game.step(1)
+    assert other not in grid.entities_table
+    assert all(other not in cell for cell in grid.cells_table.values())
+
+    mover.remove_component(Transform)
+    game.step(1)
+    assert mover not in grid.entities_table
+
+
+def test_region_physics_matches_serial():
+    rng = np.random.default_rng(0)
+    positions, velocities = rng.uniform(0, 40, (300, 2)), rng.uniform(-20, 20, (300, 2))
+    games = [Game((80, 40), 30, 60, headless=True, physics_workers=workers, region_bounds=[10, 20, 30][:workers - 1])
+             for workers in (0, 3)]
+    for game in games:
+        for pos, velocity in zip(positions, velocities):
+            body(game, pos, velocity)
+    serial, regional = games
+    try:
+        for tick in range(30):
+            if tick == 10:
+                # Written between ticks, e.g. by scripts: a body crosses two regions
+                for game in games:
+                    entity = game.entities[sorted(game.entities)[0]]
+                    entity.transform.pos = np.array([35.0, 5.0], dtype=np.float32)
+                    entity.physics.velocity[:] = (-30.0, 0.0)
+            if tick == 20:
+                for game in games:
+                    game.remove_entity(sorted(game.entities)[1])
+                    body(game, (15.0, 15.0), (5.0, 5.0))
+            # Compared tick by tick, as rounding differences grow in dense scenes
+            for source, target in zip(regional.world.archetypes_with(Physics), serial.world.archetypes_with(Physics)):
+                target.view('pos')[:] = source.view('pos')
+                target.view('velocity')[:] = source.view('velocity')
+            serial.physics_system.update(serial.world, 1 / 60)
+            expected = serial.collision_system.process_collision(serial.world, notify=False)
+            contacts = regional.region_physics.update(regional.world, 1 / 60, notify=False)
+            np.testing.assert_array_equal(contacts.pairs, expected.pairs)
+            np.testing.assert_allclose(contacts.normals, expected.normals)
+            for a, b in zip(regional.world.archetypes_with(Physics), serial.world.archetypes_with(Physics)):
+                np.testing.assert_allclose(a.view('pos'), b.view('pos'), atol=1e-4)
+                np.testing.assert_allclose(a.view('velocity'), b.view('velocity'), atol=1e-4)
+    finally:
+        regional.close()
+
+
+def test_disabled_wall_stops_colliding():
+    for broadphase in (GridBroadphase(), SortAndSweepBroadphase()):
+        game = Game((80, 40), 30, 60, headless=True, broadphase=broadphase)
+        mover = body(game, (5.0, 10.0), (10.0, 0.0))
+        wall = body(game, (8.0, 10.0))
+        wall.remove_component(Physics)
+        game.step(1)
+        wall.collider.has_collision = False
+        game.step(60)
+        assert mover.transform.pos[0] > 10.0, type(broadphase).__name__
+
+
+def test_parallel_sweep_matches_sort_and_sweep():
+    rng = np.random.default_rng(1)
+    world = World()
+    for id in range(400):
+        entity = Entity(id)
+        # Block borders every 8 units, hitboxes up to 6 wide often straddle them
+        entity.add_component(Transform(pos=rng.uniform(-20, 40, 2).astype(np.float32)))
+        entity.add_component(Collider(hitbox_x=int(rng.integers(1, 7)), hitbox_y=int(rng.integers(1, 7)),
+                                      has_collision=bool(rng.random() < 0.9)))
+        if rng.random() < 0.5:
+            entity.add_component(Physics(mass=1.0, velocity=np.zeros(2, dtype=np.float32),
+                                         acceleration=np.zeros(2, dtype=np.float32), velocity_limit=10.0))
+        world.add(entity)
+
+    bodies = Bodies(world)
+    expected = SortAndSweepBroadphase().find_pairs(bodies)
+    # Only pairs with a mover reach the narrowphase, the parallel sweep drops the rest early
+    expected = expected[bodies.dynamic[expected].any(axis=1)]
+    broadphase = ParallelSweepBroadphase(block_size=(8, 8), workers=4, min_bodies=0)
+    try:
+        pairs = broadphase.find_pairs(bodies)
+        assert broadphase.executor is not None
+    finally:
+        broadphase.close()
+    assert len(expected) > 100
+    assert np.array_equal(pairs, expected)
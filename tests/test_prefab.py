@@ -0,0 +1,43 @@
+import numpy as np
+
+from components import Physics, Transform
+from game import Game
+from prefab import Prefab
+
+
+def make_game():
+    game = Game((80, 40), 30, 60, headless=True)
+    game.prefabs['dot'] = Prefab('dot', [
+        Transform(pos=np.zeros(2, dtype=np.float32)),
+        Physics(mass=1.0, velocity=np.zeros(2, dtype=np.float32),
+                acceleration=np.zeros(2, dtype=np.float32), velocity_limit=10.0),
+    ])
+    return game
+
+
+def test_deferred_spawn_copies_arrays():
+    game = make_game()
+    pos = np.array([1.0, 2.0], dtype=np.float32)
+    velocity = np.array([3.0, 4.0], dtype=np.float32)
+    game._deferred = True
+    entity = game.spawn('dot', pos=pos, velocity=velocity)
+    pos[:] = 50.0
+    velocity[:] = 50.0
+    game._deferred = False
+    game.apply_pending()
+    assert entity.transform.pos.tolist() == [1.0, 2.0]
+    assert entity.physics.velocity.tolist() == [3.0, 4.0]
+
+
+def test_deferred_spawn_many_copies_arrays():
+    game = make_game()
+    positions = np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32)
+    velocities = np.ones((2, 2), dtype=np.float32)
+    game._deferred = True
+    entities = game.spawn_many('dot', positions, velocities)
+    positions[:] = 9.0
+    velocities[:] = 9.0
+    game._deferred = False
+    game.apply_pending()
+    assert [e.transform.pos.tolist() for e in entities] == [[1.0, 2.0], [3.0, 4.0]]
+    assert all(e.physics.velocity.tolist() == [1.0, 1.0] for e in entities)
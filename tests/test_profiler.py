@@ -0,0 +1,22 @@
+import json
+
+from components import Script
+from entity import Entity
+from game import Game
+
+
+def test_script_sections_named_by_callback(tmp_path):
+    game = Game((80, 40), 30, 60, headless=True)
+    game.profiler.enable(scripts=True)
+    for _ in range(50):
+        entity = Entity(game.new_id())
+        entity.add_component(Script(name='mover'))
+        game.add_entity(entity)
+    game.step(3)
+
+    assert {'on_tick mover', 'on_frame mover'} <= game.profiler.stats().keys()
+    assert not any('#' in name for name in game.profiler.names)
+    trace = tmp_path / 'trace.json'
+    game.profiler.export_chrome_trace(str(trace))
+    events = [e for e in json.load(open(trace))['traceEvents'] if e['name'] == 'on_tick mover']
+    assert {e['args']['entity'] for e in events} == set(game.entities)
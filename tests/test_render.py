@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+
+from components import Collider, Render, Transform
+from entity import Entity
+from render_systems import SceneRenderSystem, TerminalPresenter
+from texture_atlas import SPACE, SYMBOL_DTYPE
+from world import World
+
+
+def sprite(world, pos):
+    entity = Entity(len(world))
+    entity.add_component(Transform(pos=np.array(pos, dtype=np.float32)))
+    entity.add_component(Render(texture_id=None))
+    world.add(entity)
+    return entity
+
+
+def make_renderer():
+    renderer = SceneRenderSystem((20, 10))
+    # An untextured sprite without Collider draws nothing, give it a box
+    renderer.get_texture = lambda texture_id, hitbox: renderer.atlas.box(1, 1)
+    return renderer
+
+
+def test_render_evicts_entity_losing_render():
+    world = World()
+    entity = sprite(world, (5.0, 5.0))
+    camera = sprite(world, (0.0, 0.0))
+    camera.remove_component(Render)
+    renderer = make_renderer()
+    renderer.set_target(camera)
+    sprites = world.query(Transform, Render)
+    assert (renderer.render(sprites) != SPACE).any()
+
+    entity.remove_component(Render)
+    camera.transform.pos = np.array([1.0, 0.0], dtype=np.float32)
+    screen = renderer.render(sprites)
+    assert (screen == SPACE).all()
+    assert entity not in renderer.spatial_index.entities_table
+
+
+def test_render_empty_list_after_render():
+    world = World()
+    entity = sprite(world, (5.0, 5.0))
+    renderer = make_renderer()
+    renderer.render([entity])
+    assert (renderer.render([]) == SPACE).all()
+    assert entity not in renderer.spatial_index.entities_table
+
+
+def test_incremental_redraw_follows_hitbox_change():
+    world = World()
+    boxes = [sprite(world, (4.0 * k, -5.0)) for k in range(10)]
+    for entity in boxes:
+        entity.add_component(Collider(hitbox_x=2, hitbox_y=2))
+    renderer = SceneRenderSystem((40, 20))
+    sprites = world.query(Transform, Render)
+    renderer.render(sprites)
+
+    for width, height in ((3, 4), (1, 1)):
+        boxes[3].collider.hitbox_x, boxes[3].collider.hitbox_y = width, height
+        expected = SceneRenderSystem((40, 20)).render(list(sprites))
+        assert (expected != SPACE).sum() == 9 * 4 + width * height
+        assert (renderer.render(sprites) == expected).all()
+
+
+def test_terminal_presenter_writes_only_changed_cells():
+    stream = io.StringIO()
+    presenter = TerminalPresenter(stream)
+    frame = np.full((3, 5), ord('.'), dtype=SYMBOL_DTYPE)
+
+    def present(frame):
+        stream.seek(0)
+        stream.truncate()
+        presenter.present(frame)
+        return stream.getvalue()
+
+    assert present(frame) == '\x1b[H\x1b[2J' + '\n'.join(['.....'] * 3)
+    park = '\x1b[3;6H'
+    assert present(frame) == park
+
+    frame[1, 3] = ord('X')
+    assert present(frame) == '\x1b[2;4HX' + park
+
+    wider = np.full((3, 6), ord('.'), dtype=SYMBOL_DTYPE)
+    assert present(wider) == '\x1b[H\x1b[2J' + '\n'.join(['......'] * 3)
@@ -0,0 +1,51 @@
+import random
+
+from example import SpaceShooter
+from replay import FRAME, IDLE, MAGIC, SEED, TRANSITION, InputRecorder, Replay
+
+
+def state(shooter):
+    entities = []
+    for e in sorted(shooter.game.entities_list, key=lambda e: e.id):
+        transform, physics = e.transform, e.physics
+        entities.append((e.id, None if transform is None else transform.pos.tobytes(),
+                         None if physics is None else physics.velocity.tobytes()))
+    return shooter.score, shooter.game.tick, shooter.game.frame_count, entities
+
+
+def test_replay_reproduces_session(tmp_path):
+    path = tmp_path / 'session.rec'
+    recorder = InputRecorder(str(path), seed=12345)
+    shooter = SpaceShooter(headless=True)
+    recorder.attach(shooter.game)
+    rng = random.Random(3)
+    for frame in range(300):
+        if rng.random() < 0.2:
+            key = rng.choice('wasd ')
+            (shooter.game.input.press if rng.random() < 0.5 else shooter.game.input.release)(key)
+        shooter.game.step_frame(rng.choice((1, 2, 2, 3)))
+    recorder.close()
+    recorded = state(shooter)
+
+    replay = Replay(str(path))
+    replica = SpaceShooter(headless=True)
+    assert replay.run(replica.game) == recorded[1]
+    assert state(replica) == recorded
+    assert replay.frames == recorded[2]
+    assert any(record[0] == 'frame' and record[2] for record in replay.records)
+
+
+def test_idle_frames_collapse_per_tick_count(tmp_path):
+    path = tmp_path / 'idle.rec'
+    with InputRecorder(str(path), seed=1) as recorder:
+        for n_ticks in (2, 2, 2, 1, 1, 2):
+            recorder.record_frame(n_ticks, [])
+        recorder.record_frame(2, [('w', True)])
+        recorder.record_frame(2, [])
+
+    replay = Replay(str(path))
+    assert replay.records == [('seed', 1), ('frame', 2, (), 3), ('frame', 1, (), 2), ('frame', 2, (), 1),
+                              ('frame', 2, (('w', True),), 1), ('frame', 2, (), 1)]
+    assert (replay.frames, replay.ticks) == (8, 14)
+    assert list(replay.iter_frames()) == [(2, ())] * 3 + [(1, ())] * 2 + [(2, ()), (2, (('w', True),)), (2, ())]
+    assert path.stat().st_size == len(MAGIC) + SEED.size + 4 * IDLE.size + FRAME.size + TRANSITION.size + 1
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+from components import Transform
+from entity import EntityIds
+from example import SpaceShooter
+from game import Game
+from prefab import Prefab
+
+
+def entity_state(game):
+    return sorted(
+        (e.id, e.transform.pos.tobytes(), None if e.physics is None else e.physics.velocity.tobytes())
+        for e in game.entities.values() if e.transform is not None
+    )
+
+
+def test_stepping_fork_leaves_original_unchanged():
+    random.seed(3)
+    shooter = SpaceShooter(headless=True)
+    game = shooter.game
+    game.input.keys_pressed[' '] = True
+    game.step(60)
+    before = (entity_state(game), len(game.entities), shooter.score, shooter.enemies_count, game.tick)
+
+    forked = game.fork()
+    assert entity_state(forked) == before[0]
+    forked.input.keys_pressed[' '] = True
+    forked.step(300)
+
+    assert forked.tick == game.tick + 300
+    assert entity_state(forked) != before[0]
+    assert (entity_state(game), len(game.entities), shooter.score, shooter.enemies_count, game.tick) == before
+    assert all(e.world is forked.world for e in forked.entities.values())
+
+
+def test_restore_claims_ids():
+    game = Game((80, 40), 30, 60, headless=True)
+    game.prefabs['dot'] = Prefab('dot', [Transform(pos=np.zeros(2, dtype=np.float32))])
+    entities = game.spawn_many('dot', np.zeros((1000, 2), dtype=np.float32))
+    for entity in entities[::2]:
+        game.remove_entity(entity.id)
+    restored = Game((80, 40), 30, 60, headless=True)
+    restored.restore_snapshot(game.snapshot())
+
+    assert len(restored.entities) == 500
+    assert all(restored.ids.is_alive(id) for id in restored.entities)
+    new_ids = [restored.ids.allocate() for _ in range(1000)]
+    assert not set(new_ids) & restored.entities.keys()
+    assert len({id & EntityIds.INDEX_MASK for id in new_ids}) == 1000
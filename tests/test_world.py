@@ -0,0 +1,100 @@
+import numpy as np
+
+from components import Collider, Physics, Render, Transform
+from entity import Entity
+from world import World
+
+
+def point(world, id, x, tags=()):
+    entity = Entity(id)
+    entity.add_component(Transform(pos=np.array([x, 0.0], dtype=np.float32)))
+    for tag in tags:
+        entity.add_tag(tag)
+    world.add(entity)
+    return entity
+
+
+def test_remove_row_moves_last_row_into_place():
+    world = World()
+    entities = [point(world, id, float(id)) for id in range(4)]
+    archetype = entities[0]._archetype
+    version = archetype.version
+
+    world.remove(entities[1])
+    assert archetype.count == 3
+    assert archetype.entities == [entities[0], entities[3], entities[2]]
+    assert entities[3]._row == 1
+    assert archetype.view('pos')[:, 0].tolist() == [0.0, 3.0, 2.0]
+    assert archetype.view('slot').tolist() == [e._slot for e in archetype.entities]
+    assert archetype.version > version
+
+    world.remove(entities[2])
+    assert archetype.entities == [entities[0], entities[3]]
+    assert entities[3].transform.pos[0] == 3.0
+
+
+def test_migrate_keeps_values_across_components_and_tags():
+    world = World()
+    entity = point(world, 0, 5.0)
+    other = point(world, 1, 7.0)
+    base = entity._archetype
+
+    entity.add_component(Collider(hitbox_x=3, hitbox_y=4))
+    assert entity._archetype is not base and entity._archetype.signature == {Transform, Collider}
+    assert (entity.transform.pos[0], entity.collider.hitbox_x, entity.collider.hitbox_y) == (5.0, 3, 4)
+    assert base.entities == [other] and other._row == 0
+
+    entity.add_tag('wall')
+    assert entity.has_tag('wall') and entity._archetype.signature == {Transform, Collider, 'wall'}
+    assert entity.collider.hitbox_y == 4
+
+    entity.remove_component(Collider)
+    entity.remove_tag('wall')
+    assert entity._archetype is base
+    assert entity.collider is None and not entity.has_tag('wall')
+    assert entity.transform.pos[0] == 5.0
+    assert len(world) == 2 and world.slot_entities[entity._slot] is entity
+
+
+def test_remove_detaches_component_copies():
+    world = World()
+    entity = point(world, 0, 2.0, tags=('enemy',))
+    entity.add_component(Render(texture_id='ship'))
+    slot = entity._slot
+
+    world.remove(entity)
+    assert entity.world is None and entity._slot == -1 and len(world) == 0
+    assert world.slot_entities[slot] is None
+    transform = entity.transform
+    assert isinstance(transform, Transform) and transform.pos[0] == 2.0
+    assert entity.render.texture_id == 'ship' and entity.tags == {'enemy'}
+
+    # The copies no longer alias storage reused by other entities
+    other = point(world, 1, 9.0)
+    assert other._slot == slot
+    transform.pos[0] = -1.0
+    assert other.transform.pos[0] == 9.0
+
+    world.add(entity)
+    assert entity.transform.pos[0] == -1.0 and entity.has_tag('enemy')
+
+
+def test_query_follows_new_archetypes():
+    world = World()
+    movers = world.query(Transform, Physics)
+    tagged = world.query('enemy')
+    assert len(movers) == 0 and not tagged
+
+    entity = point(world, 0, 0.0)
+    assert len(movers) == 0
+    entity.add_component(Physics(mass=1.0, velocity=np.zeros(2, dtype=np.float32),
+                                 acceleration=np.zeros(2, dtype=np.float32), velocity_limit=1.0))
+    assert list(movers) == [entity]
+    entity.add_tag('enemy')
+    assert list(movers) == [entity] and tagged.entities() == [entity]
+    assert world.query(Transform, Physics) is movers
+
+    point(world, 1, 0.0, tags=('enemy',))
+    assert len(tagged) == 2 and len(movers) == 1
+    entity.remove_component(Physics)
+    assert not movers and len(tagged) == 2
@@ -0,0 +1,160 @@
+from typing import Iterable, Optional
+import numpy as np
+import json
+import os
+
+
+# Textures hold unicode code points
+SYMBOL_DTYPE = np.dtype('<u4')
+SPACE = ord(' ')
+
+
+def rows_to_array(rows: list[str]) -> np.ndarray:
+    """Converts a list of strings to a 2D array of code points padded with spaces"""
+    width = max((len(row) for row in rows), default=0)
+    return np.array([row.ljust(width) for row in rows], dtype=f'<U{max(width, 1)}').view(SYMBOL_DTYPE).reshape(len(rows), -1)[:, :width]
+
+
+class Texture:
+    """Texture converted for blitting.
+
+    Rows are stored top to bottom as they appear on screen, spaces are
+    transparent.
+    """
+    __slots__ = ('symbols', 'mask')
+
+    def __init__(self, symbols: np.ndarray, mask: Optional[np.ndarray] = None):
+        self.symbols = symbols
+        self.mask = symbols != SPACE if mask is None else mask
+
+    @classmethod
+    def from_rows(cls, rows: list[str]) -> 'Texture':
+        # Texture rows are listed bottom to top in textures.json
+        return cls(np.ascontiguousarray(rows_to_array(rows)[::-1]))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.symbols.shape
+
+
+class TextureAtlas:
+    """Compiled texture storage.
+
+    All textures of a JSON source are packed into a single code point array
+    (texture rows stacked on top of each other, padded to the widest one)
+    plus offsets and shapes. The compiled atlas is cached next to the source
+    in a binary file keyed by the source modification time, and nothing is
+    read until the first texture is requested.
+
+    Box textures for entities without a texture are synthesized once per
+    size and shared.
+
+    Attributes:
+        filename: Name of the JSON source.
+        search_path: Directories searched for the source, in order.
+        box_symbol: Symbol used to fill synthesized box textures.
+    """
+    CACHE_SUFFIX = '.atlas.npz'
+
+    def __init__(self, filename: str = 'textures.json', search_path: Optional[Iterable[str]] = None,
+                 box_symbol: str = '#'):
+        self.filename = filename
+        if search_path is None:
+            search_path = [os.getcwd(), os.path.dirname(os.path.abspath(__file__))]
+        self.search_path = list(search_path)
+        self.box_symbol = box_symbol
+        self.loaded = False
+        self.index: dict[str, int] = {}
+        self.symbols = np.zeros((0, 0), dtype=SYMBOL_DTYPE)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.shapes = np.zeros((0, 2), dtype=np.int64)
+        self.textures: dict[str, Texture] = {}
+        self.boxes: dict[tuple[int, int], Texture] = {}
+
+    def find_source(self) -> Optional[str]:
+        """Returns path of the first source found on the search path"""
+        if os.path.isabs(self.filename):
+            return self.filename if os.path.isfile(self.filename) else None
+        for directory in self.search_path:
+            path = os.path.join(directory, self.filename)
+            if os.path.isfile(path): return path
+        return None
+
+    def reload(self):
+        """Drops loaded textures, the source is read again on next use"""
+        self.loaded = False
+        self.textures = {}
+
+    def load(self):
+        """Loads the atlas from cache or compiles it from the source"""
+        self.loaded = True
+        self.textures = {}
+        path = self.find_source()
+        if path is None:
+            raise FileNotFoundError(f'{self.filename} not found in {self.search_path}')
+
+        mtime = os.stat(path).st_mtime_ns
+        cache_path = os.path.splitext(path)[0] + self.CACHE_SUFFIX
+        if not self._load_cache(cache_path, mtime):
+            with open(path, 'r') as f:
+                self.compile(json.load(f))
+            self._save_cache(cache_path, mtime)
+
+    def compile(self, sources: dict[str, list[str]]):
+        """Packs textures given as lists of rows into the atlas"""
+        names = list(sources)
+        arrays = [rows_to_array(sources[name])[::-1] for name in names]
+        self.shapes = np.array([a.shape for a in arrays], dtype=np.int64).reshape(-1, 2)
+        self.offsets = np.concatenate(([0], np.cumsum(self.shapes[:, 0])[:-1])).astype(np.int64)
+        self.symbols = np.full((int(self.shapes[:, 0].sum()), int(self.shapes[:, 1].max(initial=0))),
+                               SPACE, dtype=SYMBOL_DTYPE)
+        for offset, a in zip(self.offsets, arrays):
+            self.symbols[offset:offset + a.shape[0], :a.shape[1]] = a
+        self.index = {name: i for i, name in enumerate(names)}
+        self.textures = {}
+        self.loaded = True
+
+    def _load_cache(self, cache_path: str, mtime: int) -> bool:
+        try:
+            with np.load(cache_path, allow_pickle=False) as cache:
+                if int(cache['mtime']) != mtime: return False
+                self.symbols = cache['symbols']
+                self.offsets = cache['offsets']
+                self.shapes = cache['shapes']
+                self.index = {name: i for i, name in enumerate(cache['names'].tolist())}
+            return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def _save_cache(self, cache_path: str, mtime: int):
+        names = np.array(list(self.index), dtype=str)
+        try:
+            with open(cache_path, 'wb') as f:
+                np.savez(f, mtime=np.int64(mtime), symbols=self.symbols, offsets=self.offsets,
+                         shapes=self.shapes, names=names)
+        except OSError:
+            pass
+
+    def __contains__(self, texture_id: str) -> bool:
+        if not self.loaded: self.load()
+        return texture_id in self.index
+
+    def get(self, texture_id: str) -> Optional[Texture]:
+        """Returns texture by id or None if the atlas has no such texture"""
+        texture = self.textures.get(texture_id)
+        if texture is not None: return texture
+        if not self.loaded: self.load()
+        i = self.index.get(texture_id)
+        if i is None: return None
+        (height, width), offset = self.shapes[i], self.offsets[i]
+        texture = self.textures[texture_id] = Texture(self.symbols[offset:offset + height, :width])
+        return texture
+
+    def box(self, width: int, height: int) -> Texture:
+        """Returns a filled box texture of given size"""
+        key = (int(width), int(height))
+        texture = self.boxes.get(key)
+        if texture is None:
+            symbols = np.full((max(key[1], 0), max(key[0], 0)), ord(self.box_symbol), dtype=SYMBOL_DTYPE)
+            texture = self.boxes[key] = Texture(symbols)
+        return texture
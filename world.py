@@ -0,0 +1,559 @@
+from dataclasses import fields
+from typing import Any, Iterable, Optional
+import numpy as np
+from components import *
+
+
+# Column layout of every component type: field name -> (dtype, per-row shape).
+# Field names are unique across components, so an archetype keys its columns by name.
+COMPONENT_COLUMNS = {
+    Transform: {
+        'pos': (np.float32, (2,)),
+    },
+    Physics: {
+        'mass': (np.float64, ()),
+        'velocity': (np.float32, (2,)),
+        'acceleration': (np.float32, (2,)),
+        'velocity_limit': (np.float64, ()),
+    },
+    Collider: {
+        'hitbox_x': (np.int32, ()),
+        'hitbox_y': (np.int32, ()),
+        'has_collision': (np.bool_, ()),
+    },
+    Render: {
+        'is_visible': (np.bool_, ()),
+        'draw_priority': (np.int32, ()),
+        'texture_id': (object, ()),
+    },
+    Script: {
+        'script': (object, ()),
+    },
+}
+
+
+class Archetype:
+    """Struct-of-arrays storage for all entities sharing one component set.
+
+    Attributes:
+        signature: Frozen set of component types stored in this archetype
+                   and tags (strings) shared by its entities.
+        count: Number of live rows.
+        version: Counter bumped on every structural change or component write
+                 through the World, lets systems skip unchanged archetypes.
+        entities: Entity handles by row.
+        pool: Handles of entities released from this archetype, kept for
+              reuse by spawns.
+        columns: Column name -> numpy array with at least `count` rows.
+                 Only the first `count` rows are meaningful, use `view()`.
+    """
+
+    def __init__(self, signature: frozenset):
+        self.signature = signature
+        self.count = 0
+        self.capacity = 0
+        self.version = 0
+        self.entities = []
+        self.pool = []
+        self.layout = {'slot': (np.int64, ())}
+        for term in signature:
+            if term in COMPONENT_COLUMNS: self.layout.update(COMPONENT_COLUMNS[term])
+        self.columns = {
+            name: np.zeros((0,) + shape, dtype=dtype)
+            for name, (dtype, shape) in self.layout.items()
+        }
+
+    def view(self, name: str) -> np.ndarray:
+        """Returns the live part of a column (writes go straight into storage)"""
+        return self.columns[name][:self.count]
+
+    def _grow(self, min_capacity: int):
+        capacity = max(8, self.capacity * 2, min_capacity)
+        for name, (dtype, shape) in self.layout.items():
+            column = np.zeros((capacity,) + shape, dtype=dtype)
+            column[:self.count] = self.columns[name][:self.count]
+            self.columns[name] = column
+        self.capacity = capacity
+
+    def append(self, entity, values: dict[str, Any]) -> int:
+        """Appends a row for entity and returns its index"""
+        if self.count == self.capacity:
+            self._grow(self.count + 1)
+        row = self.count
+        for name, value in values.items():
+            self.columns[name][row] = value
+        self.entities.append(entity)
+        self.count += 1
+        self.version += 1
+        return row
+
+    def extend(self, entities: list, values: dict[str, Any]) -> int:
+        """Appends rows for entities from column arrays, returns index of the first row.
+
+        Columns missing from values are zero (None for object columns).
+        """
+        n = len(entities)
+        if self.count + n > self.capacity:
+            self._grow(self.count + n)
+        start, stop = self.count, self.count + n
+        for name, (dtype, _) in self.layout.items():
+            column = self.columns[name]
+            if name in values:
+                column[start:stop] = values[name]
+            else:
+                column[start:stop] = None if dtype is object else 0
+        self.entities.extend(entities)
+        self.count = stop
+        self.version += 1
+        return start
+
+    def remove_row(self, row: int):
+        """Removes a row by moving the last row into its place"""
+        last = self.count - 1
+        if row != last:
+            for column in self.columns.values():
+                column[row] = column[last]
+            moved = self.entities[last]
+            self.entities[row] = moved
+            moved._row = row
+        for name, (dtype, _) in self.layout.items():
+            if dtype is object: self.columns[name][last] = None
+        self.entities.pop()
+        self.count -= 1
+        self.version += 1
+
+    def row_values(self, row: int) -> dict[str, Any]:
+        """Returns copies of all component values stored in a row"""
+        return {
+            name: self.columns[name][row].copy() if self.layout[name][1] else self.columns[name][row]
+            for name in self.layout if name != 'slot'
+        }
+
+
+class ChangeTracker:
+    """Set of world slots changed since the consumer last took them.
+
+    Every consumer (renderer, broadphase, ...) gets its own tracker from
+    `World.track()`. `changed` allows skipping unchanged states in O(1).
+    """
+
+    def __init__(self):
+        self.mask = np.zeros(64, dtype=bool)
+        self.changed = False
+
+    def _ensure(self, size: int):
+        if size > len(self.mask):
+            mask = np.zeros(max(size, 2 * len(self.mask)), dtype=bool)
+            mask[:len(self.mask)] = self.mask
+            self.mask = mask
+
+    def mark(self, slot: int):
+        if slot >= len(self.mask): self._ensure(slot + 1)
+        self.mask[slot] = True
+        self.changed = True
+
+    def mark_many(self, slots: np.ndarray):
+        if len(slots) == 0: return
+        self._ensure(int(slots.max()) + 1)
+        self.mask[slots] = True
+        self.changed = True
+
+    def take(self) -> np.ndarray:
+        """Returns changed slots and clears the tracker"""
+        if not self.changed: return np.zeros(0, dtype=np.intp)
+        slots = np.flatnonzero(self.mask)
+        self.mask[slots] = False
+        self.changed = False
+        return slots
+
+
+class TrackedArray(np.ndarray):
+    """Numpy view into a column which reports in-place writes to its World"""
+
+    def __array_finalize__(self, obj):
+        self._world = None
+        self._slot = -1
+
+    def _mark(self):
+        if self._world is not None: self._world.mark_dirty(self._slot)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._mark()
+
+    def __array_ufunc__(self, ufunc, method, *inputs, out=None, **kwargs):
+        inputs = tuple(x.view(np.ndarray) if isinstance(x, TrackedArray) else x for x in inputs)
+        if out is not None:
+            for o in out:
+                if isinstance(o, TrackedArray): o._mark()
+            kwargs['out'] = tuple(o.view(np.ndarray) if isinstance(o, TrackedArray) else o for o in out)
+        result = getattr(ufunc, method)(*inputs, **kwargs)
+        return out[0] if out is not None and len(out) == 1 else result
+
+    def __repr__(self):
+        return repr(self.view(np.ndarray))
+
+
+class _Column:
+    """Descriptor that maps a component field to the entity's row in a column.
+
+    Writes to tracked columns mark the entity as changed in its World.
+    """
+
+    def __init__(self, name: str, tracked: bool = False):
+        self.name = name
+        self.tracked = tracked
+
+    def __get__(self, view, owner=None):
+        if view is None: return self
+        entity = view._entity
+        value = entity._archetype.columns[self.name][entity._row]
+        if isinstance(value, np.generic): return value.item()
+        if self.tracked and isinstance(value, np.ndarray):
+            value = value.view(TrackedArray)
+            value._world = entity.world
+            value._slot = entity._slot
+        return value
+
+    def __set__(self, view, value):
+        entity = view._entity
+        entity._archetype.columns[self.name][entity._row] = value
+        if self.tracked: entity.world.mark_dirty(entity._slot)
+
+
+class ComponentView:
+    """Live handle to the component data of an entity stored in a World.
+
+    Attribute reads return values straight from the archetype columns, vector
+    fields are numpy views, so in-place edits like `pos[0] -= 1` are stored.
+    Scalar fields are returned as plain Python values.
+    """
+    __slots__ = ('_entity',)
+    component: type = None
+
+    def __init__(self, entity):
+        self._entity = entity
+
+    def to_component(self):
+        """Returns a detached dataclass copy of the component"""
+        entity = self._entity
+        return _make_component(self.component, entity._archetype.row_values(entity._row))
+
+    def __eq__(self, other):
+        if isinstance(other, ComponentView): other = other.to_component()
+        return self.to_component() == other
+
+    def __repr__(self):
+        values = ', '.join(f'{f.name}={getattr(self, f.name)!r}' for f in fields(self.component))
+        return f'{type(self).__name__}({values})'
+
+
+class TransformView(ComponentView):
+    __slots__ = ()
+    component = Transform
+    pos = _Column('pos', tracked=True)
+
+
+class PhysicsView(ComponentView):
+    __slots__ = ()
+    component = Physics
+    mass = _Column('mass')
+    velocity = _Column('velocity')
+    acceleration = _Column('acceleration')
+    velocity_limit = _Column('velocity_limit')
+
+
+class ColliderView(ComponentView):
+    __slots__ = ()
+    component = Collider
+    hitbox_x = _Column('hitbox_x', tracked=True)
+    hitbox_y = _Column('hitbox_y', tracked=True)
+    has_collision = _Column('has_collision', tracked=True)
+
+
+class RenderView(ComponentView):
+    __slots__ = ()
+    component = Render
+    is_visible = _Column('is_visible', tracked=True)
+    draw_priority = _Column('draw_priority', tracked=True)
+    texture_id = _Column('texture_id', tracked=True)
+
+
+COMPONENT_VIEWS = {
+    Transform: TransformView,
+    Physics: PhysicsView,
+    Collider: ColliderView,
+    Render: RenderView,
+}
+
+
+def _component_values(component) -> dict[str, Any]:
+    if isinstance(component, Script): return {'script': component}
+    return {f.name: getattr(component, f.name) for f in fields(component)}
+
+
+def _make_component(component_type: type, values: dict[str, Any]):
+    if component_type is Script: return values['script']
+    kwargs = {}
+    for name in COMPONENT_COLUMNS[component_type]:
+        value = values[name]
+        kwargs[name] = value.item() if isinstance(value, np.generic) else value
+    return component_type(**kwargs)
+
+
+class Query:
+    """Live set of entities having all given component types and tags.
+
+    The list of matching archetypes is maintained by the World as new
+    archetypes appear, so iterating a query never inspects other entities
+    and its length is a sum over a few archetype counters.
+    """
+
+    def __init__(self, terms: frozenset, world: 'World'):
+        self.terms = terms
+        self.world = world
+        self.archetypes: list[Archetype] = []
+
+    def _match(self, archetype: Archetype):
+        if archetype.signature.issuperset(self.terms): self.archetypes.append(archetype)
+
+    def __len__(self):
+        return sum(a.count for a in self.archetypes)
+
+    def __bool__(self):
+        return any(a.count for a in self.archetypes)
+
+    def __iter__(self):
+        for a in self.archetypes:
+            yield from a.entities[:]
+
+    def entities(self) -> list:
+        """Returns matching entities as a list"""
+        entities = []
+        for a in self.archetypes:
+            entities.extend(a.entities)
+        return entities
+
+
+class World:
+    """Archetype-based component storage.
+
+    Entities with the same set of components and tags share an Archetype
+    whose fields are kept in contiguous numpy columns. Entities become
+    handles: their component properties return views into those columns,
+    while systems can process whole columns via `query(...).archetypes`.
+    """
+
+    def __init__(self):
+        self.archetypes: dict[frozenset, Archetype] = {}
+        self.queries: dict[frozenset, Query] = {}
+        self.trackers: list[ChangeTracker] = []
+        self.slot_entities = []
+        self._free_slots = []
+        self._next_slot = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def archetype(self, signature: Iterable[type]) -> Archetype:
+        """Returns archetype for component set, creating it if needed"""
+        signature = frozenset(signature)
+        archetype = self.archetypes.get(signature)
+        if archetype is None:
+            archetype = Archetype(signature)
+            self.archetypes[signature] = archetype
+            for query in self.queries.values():
+                query._match(archetype)
+        return archetype
+
+    def query(self, *terms) -> Query:
+        """Returns cached query of entities with all given component types and tags"""
+        key = frozenset(terms)
+        query = self.queries.get(key)
+        if query is None:
+            query = self.queries[key] = Query(key, self)
+            for archetype in self.archetypes.values():
+                query._match(archetype)
+        return query
+
+    def archetypes_with(self, *terms) -> list[Archetype]:
+        """Returns all archetypes which contain every given component type and tag"""
+        return self.query(*terms).archetypes
+
+    def entities_with(self, *terms) -> list:
+        """Returns all entities which have every given component type and tag"""
+        return self.query(*terms).entities()
+
+    def track(self) -> ChangeTracker:
+        """Returns a new tracker of changed slots for a consumer"""
+        tracker = ChangeTracker()
+        self.trackers.append(tracker)
+        return tracker
+
+    def mark_dirty(self, slots):
+        """Marks slot(s) as changed for all trackers.
+
+        Writes through component views and structural changes are marked
+        automatically, systems writing columns directly must call this.
+        """
+        if isinstance(slots, (int, np.integer)):
+            for tracker in self.trackers: tracker.mark(slots)
+        else:
+            for tracker in self.trackers: tracker.mark_many(slots)
+
+    def _alloc_slot(self, entity) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self.slot_entities[slot] = entity
+            return slot
+        self.slot_entities.append(entity)
+        self._next_slot += 1
+        return self._next_slot - 1
+
+    def _alloc_slots(self, entities: list) -> np.ndarray:
+        reused = [self._free_slots.pop() for _ in range(min(len(entities), len(self._free_slots)))]
+        for slot, entity in zip(reused, entities):
+            self.slot_entities[slot] = entity
+        fresh = entities[len(reused):]
+        self.slot_entities.extend(fresh)
+        self._next_slot += len(fresh)
+        return np.concatenate((np.array(reused, dtype=np.int64),
+                               np.arange(self._next_slot - len(fresh), self._next_slot, dtype=np.int64)))
+
+    def add_many(self, entities: list, signature: Iterable, values: dict[str, Any]):
+        """Adds new entities sharing a component set in one batch.
+
+        Args:
+            entities: Entities not belonging to any world; their own
+                      components are ignored.
+            signature: Component types and tags of all entities.
+            values: Column name -> values for all entities (arrays with one
+                    row per entity, or a value broadcast to all of them).
+        """
+        for entity in entities:
+            if entity.world is not None:
+                raise ValueError(f'Entity {entity.id} already belongs to a world')
+        archetype = self.archetype(signature)
+        slots = self._alloc_slots(entities)
+        start = archetype.extend(entities, dict(values, slot=slots))
+        for row, (entity, slot) in enumerate(zip(entities, slots.tolist()), start):
+            entity._archetype = archetype
+            entity._row = row
+            entity._slot = slot
+            entity.world = self
+            entity.components_dict = {}
+        self._count += len(entities)
+        self.mark_dirty(slots)
+
+    def add(self, entity):
+        """Moves entity's components into world storage"""
+        components = {t: c for t, c in entity.components_dict.items() if t is not None}
+        values = {}
+        for component in components.values():
+            values.update(_component_values(component))
+        self.insert(entity, components.keys() | entity._tags, values)
+
+    def insert(self, entity, signature: Iterable, values: dict[str, Any]):
+        """Adds an entity with column values instead of its own components.
+
+        Columns missing from values keep whatever the reused row holds, so
+        values should cover the whole layout.
+        """
+        if entity.world is not None:
+            raise ValueError(f'Entity {entity.id} already belongs to a world')
+        archetype = self.archetype(signature)
+        values['slot'] = slot = self._alloc_slot(entity)
+        entity._row = archetype.append(entity, values)
+        entity._archetype = archetype
+        entity._slot = slot
+        entity.world = self
+        entity.components_dict = {}
+        self._count += 1
+        self.mark_dirty(slot)
+
+    def remove(self, entity):
+        """Removes entity from world, it keeps detached copies of its components"""
+        if entity.world is not self: return
+        archetype = entity._archetype
+        values = archetype.row_values(entity._row)
+        entity.components_dict = {t: _make_component(t, values) for t in archetype.signature if not isinstance(t, str)}
+        entity._tags = {t for t in archetype.signature if isinstance(t, str)}
+        archetype.remove_row(entity._row)
+        self.mark_dirty(entity._slot)
+        self.slot_entities[entity._slot] = None
+        self._free_slots.append(entity._slot)
+        entity.world = None
+        entity._archetype = None
+        entity._row = -1
+        entity._slot = -1
+        self._count -= 1
+
+    def release(self, entity):
+        """Removes entity from world into its archetype's pool.
+
+        Unlike `remove` no component copies are made, the handle only keeps
+        its Script (in `components_dict`) to be reused by the next spawn.
+        """
+        if entity.world is not self: return
+        archetype = entity._archetype
+        script = archetype.columns['script'][entity._row] if Script in archetype.signature else None
+        archetype.remove_row(entity._row)
+        self.mark_dirty(entity._slot)
+        self.slot_entities[entity._slot] = None
+        self._free_slots.append(entity._slot)
+        entity.components_dict = {} if script is None else {Script: script}
+        entity._tags = set()
+        entity.world = None
+        entity._archetype = None
+        entity._row = -1
+        entity._slot = -1
+        self._count -= 1
+        archetype.pool.append(entity)
+
+    def _migrate(self, entity, signature: frozenset, values: dict[str, Any]):
+        old = entity._archetype
+        merged = old.row_values(entity._row)
+        merged.update(values)
+        new = self.archetype(signature)
+        merged = {name: merged[name] for name in new.layout if name in merged}
+        merged['slot'] = entity._slot
+        old.remove_row(entity._row)
+        entity._row = new.append(entity, merged)
+        entity._archetype = new
+        self.mark_dirty(entity._slot)
+
+    def set_component(self, entity, component):
+        """Adds or replaces a component of an entity stored in this world"""
+        component_type = entity.get_type(component)
+        values = _component_values(component)
+        archetype = entity._archetype
+        if component_type in archetype.signature:
+            for name, value in values.items():
+                archetype.columns[name][entity._row] = value
+            archetype.version += 1
+            self.mark_dirty(entity._slot)
+        else:
+            self._migrate(entity, archetype.signature | {component_type}, values)
+
+    def remove_component(self, entity, component_type: type):
+        """Removes a component type from an entity stored in this world"""
+        if component_type not in entity._archetype.signature: return
+        self._migrate(entity, entity._archetype.signature - {component_type}, {})
+
+    def add_tag(self, entity, tag: str):
+        """Tags an entity stored in this world"""
+        if tag in entity._archetype.signature: return
+        self._migrate(entity, entity._archetype.signature | {tag}, {})
+
+    def remove_tag(self, entity, tag: str):
+        """Removes a tag from an entity stored in this world"""
+        if tag not in entity._archetype.signature: return
+        self._migrate(entity, entity._archetype.signature - {tag}, {})
+
+    def get_component(self, entity, component_type: type) -> Optional[Any]:
+        """Returns live view (or Script object) of entity's component"""
+        archetype = entity._archetype
+        if component_type not in archetype.signature: return None
+        if component_type is Script: return archetype.columns['script'][entity._row]
+        return COMPONENT_VIEWS[component_type](entity)